@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+"""
+Measure the throughput of GitlabCodeClimateFormatter.
+
+    $ python benchmarks/formatter.py --count 200000 --tee
+
+Writes synthetic violations to os.devnull and reports issues per second,
+then compares serializing issues through json.dumps() of the issue dict
+with the per-code templates the formatter uses.
+"""
+import argparse
+import contextlib
+import json
+import os
+import time
+import tracemalloc
+
+from flake8_gl_codeclimate import GitlabCodeClimateFormatter
+
+from synthetic import make_violations
+
+
+def run(violations, buffer_size, tee):
+    options = argparse.Namespace(
+        output_file=os.devnull,
+        tee=tee,
+        color="never",
+        gl_codeclimate_buffer_size=buffer_size,
+    )
+    fmt = GitlabCodeClimateFormatter(options)
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        start = time.perf_counter()
+        fmt.start()
+        for v in violations:
+            fmt.handle(v)
+        fmt.stop()
+        return time.perf_counter() - start
+
+
+def serialize_dict(fmt, violations):
+    for v in violations:
+        json.dumps(fmt._violation_to_codeclimate_issue(v))
+
+
+def serialize_template(fmt, violations):
+    for v in violations:
+        fmt._violation_to_json(v)
+
+
+def bytes_per_violation(func, fmt, violations):
+    """
+    Peak memory traced while serializing a single violation at a time.
+    """
+    func(fmt, violations[:1000])  # warm up caches
+    tracemalloc.start()
+    try:
+        peak = 0
+        for v in violations[:1000]:
+            tracemalloc.reset_peak()
+            base, _ = tracemalloc.get_traced_memory()
+            func(fmt, [v])
+            peak += tracemalloc.get_traced_memory()[1] - base
+        return peak / 1000
+    finally:
+        tracemalloc.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--count", type=int, default=200000)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--tee", action="store_true", default=False)
+    options = parser.parse_args()
+
+    violations = make_violations(options.count)
+    for label, buffer_size in [("unbuffered", 0), ("buffered", 64 * 1024)]:
+        best = min(run(violations, buffer_size, options.tee)
+                   for _ in range(options.repeat))
+        print("{:<12} {:>10.0f} issues/s".format(label, len(violations) / best))
+
+    fmt = GitlabCodeClimateFormatter(argparse.Namespace(
+        output_file=None, tee=False, color="never"))
+    for label, func in [("dict", serialize_dict), ("template", serialize_template)]:
+        best = float("inf")
+        for _ in range(options.repeat):
+            start = time.perf_counter()
+            func(fmt, violations)
+            best = min(best, time.perf_counter() - start)
+        print("{:<12} {:>10.0f} issues/s {:>8.0f} bytes/issue".format(
+            label, len(violations) / best, bytes_per_violation(func, fmt, violations)))
+
+
+if __name__ == "__main__":
+    main()
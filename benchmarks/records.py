@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+"""
+Compare the peak RSS of keeping issues around in different forms.
+
+    $ python benchmarks/records.py --count 1000000
+
+Every form is measured in a fresh process, which creates the synthetic
+violations in chunks and keeps only the converted issues:
+
+  dict       issue dicts as built for json.dumps()
+  violation  flake8 Violation namedtuples
+  record     Issue records including their fingerprint, as kept for sorting
+  json       serialized issues, as the cache stores them
+"""
+import argparse
+import os
+import resource
+import subprocess  # noqa: S404
+import sys
+
+from flake8_gl_codeclimate import GitlabCodeClimateFormatter, Issue, fingerprint
+
+from synthetic import make_violations
+
+FORMS = ["dict", "violation", "record", "json"]
+CHUNK = 10000
+
+
+def convert(form, fmt):
+    if form == "dict":
+        return fmt._violation_to_codeclimate_issue
+    if form == "violation":
+        return lambda v: v
+    if form == "record":
+        return lambda v: Issue.from_violation(v, fingerprint.fingerprint(v))
+    return fmt._violation_to_json
+
+
+def max_rss():
+    # Kilobytes on Linux.
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+def measure(form, count, per_file):
+    fmt = GitlabCodeClimateFormatter(argparse.Namespace(
+        output_file=os.devnull, tee=False, color="never"))
+    func = convert(form, fmt)
+    before = max_rss()
+    kept = []
+    for start in range(0, count, CHUNK):
+        chunk = make_violations(min(CHUNK, count - start), per_file=per_file, seed=start)
+        kept.extend(func(v) for v in chunk)
+        del chunk
+
+    print(max_rss() - before)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--count", type=int, default=1000000)
+    parser.add_argument("--per-file", type=int, default=100)
+    parser.add_argument("--form", choices=FORMS, help=argparse.SUPPRESS)
+    options = parser.parse_args()
+
+    if options.form:
+        measure(options.form, options.count, options.per_file)
+        return
+
+    for form in FORMS:
+        out = subprocess.check_output([  # noqa: S603
+            sys.executable, __file__, "--form", form,
+            "--count", str(options.count), "--per-file", str(options.per_file),
+        ])
+        rss = int(out)
+        print("{:<10} {:>8.1f} MiB {:>6.0f} bytes/issue".format(
+            form, rss / 2**20, rss / options.count))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,364 @@
+#!/usr/bin/env python3
+"""
+Benchmark suite for the formatter and report converter hot paths.
+
+    $ python benchmarks/suite.py run --output baseline.json
+    ... change things ...
+    $ python benchmarks/suite.py run --output current.json
+    $ python benchmarks/suite.py compare baseline.json current.json
+
+compare exits with status 1 if any metric regressed by more than the
+threshold. Throughput metrics (*_per_s) regress when they drop, memory
+metrics (*_bytes*) when they grow.
+
+benchmarks/baseline.json holds a run with the default parameters. Its
+throughput numbers depend on the machine, rerun it there before
+comparing them.
+"""
+import argparse
+import contextlib
+import importlib.util
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+import tracemalloc
+import unittest.mock
+
+from flake8_gl_codeclimate import GitlabCodeClimateFormatter, baseline, compression, fingerprint
+
+from synthetic import (
+    CODES,
+    default_format,
+    make_violations,
+    parse_distribution,
+    pylint_format,
+)
+
+# Violations per file of the formatter-dense benchmark, e.g. legacy code
+# with a line length limit.
+DENSE_PER_FILE = 5000
+
+CONVERTER = os.path.join(os.path.dirname(__file__), os.pardir,
+                         "scripts", "report-to-gl-codeclimate.py")
+
+
+def load_converter():
+    spec = importlib.util.spec_from_file_location("report_to_gl_codeclimate", CONVERTER)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def measure(func, count, repeat):
+    """
+    Call func repeat times, returning the best throughput and the peak
+    traced memory of one more call.
+    """
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+
+    tracemalloc.start()
+    try:
+        func()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    return {
+        "items_per_s": count / best,
+        "peak_bytes": peak,
+    }
+
+
+def per_item_bytes(func, items):
+    """
+    Average peak traced memory for processing a single item.
+    """
+    tracemalloc.start()
+    try:
+        total = 0
+        for item in items:
+            tracemalloc.reset_peak()
+            base, _ = tracemalloc.get_traced_memory()
+            func(item)
+            total += tracemalloc.get_traced_memory()[1] - base
+        return total / len(items)
+    finally:
+        tracemalloc.stop()
+
+
+def bench_formatter(violations, repeat, **extra_options):
+    options = argparse.Namespace(output_file=os.devnull, tee=False, color="never",
+                                 **extra_options)
+
+    def run():
+        fmt = GitlabCodeClimateFormatter(options)
+        fmt.start()
+        for v in violations:
+            fmt.handle(v)
+        fmt.stop()
+
+    result = measure(run, len(violations), repeat)
+
+    fmt = GitlabCodeClimateFormatter(options)
+    for v in violations[:1000]:  # warm up per-code caches
+        fmt._violation_to_json(v)
+    result["alloc_bytes_per_item"] = per_item_bytes(fmt._violation_to_json,
+                                                    violations[:1000])
+    return result
+
+
+def bench_output(violations, filename, compact, repeat):
+    """
+    Throughput and size of writing a report to filename, compressed
+    depending on its suffix.
+    """
+    options = argparse.Namespace(output_file=filename, tee=False, color="never",
+                                 gl_codeclimate_compact=compact)
+
+    def run():
+        if os.path.exists(filename):
+            os.unlink(filename)  # the formatter appends
+        fmt = GitlabCodeClimateFormatter(options)
+        fmt.start()
+        for v in violations:
+            fmt.handle(v)
+        fmt.stop()
+
+    result = measure(run, len(violations), repeat)
+    result["output_bytes"] = os.path.getsize(filename)
+    return result
+
+
+class SlowSink:
+    """
+    An output file taking latency seconds per write plus the time to
+    transfer the data at bytes_per_s, without holding the GIL.
+    """
+    def __init__(self, latency=0.002, bytes_per_s=20 * 1024 * 1024):
+        self.latency = latency
+        self.bytes_per_s = bytes_per_s
+
+    def write(self, data):
+        time.sleep(self.latency + len(data) / self.bytes_per_s)
+
+    def close(self):
+        pass
+
+
+def bench_slow_sink(violations, async_write, repeat):
+    options = argparse.Namespace(output_file=None, tee=False, color="never",
+                                 gl_codeclimate_async_write=async_write)
+
+    def run():
+        fmt = GitlabCodeClimateFormatter(options)
+        fmt.output_fd = SlowSink()
+        fmt.start()
+        for v in violations:
+            fmt.handle(v)
+        fmt.stop()
+
+    return measure(run, len(violations), repeat)
+
+
+def have_zstd():
+    try:
+        compression._zstd(os.devnull, "a").close()
+    except ImportError:
+        return False
+    return True
+
+
+def bench_baseline(violations, repeat, tmpdir):
+    """
+    Lookups of fingerprints in a baseline index of all violations, and
+    loading the index.
+    """
+    fingerprints = [fingerprint.fingerprint(v) for v in violations]
+    index_fn = os.path.join(tmpdir, "baseline.idx")
+    baseline.Baseline.from_fingerprints(fingerprints).save(index_fn)
+    b = baseline.load(index_fn)
+
+    def run():
+        return sum(f in b for f in fingerprints)
+
+    result = measure(run, len(fingerprints), repeat)
+    start = time.perf_counter()
+    baseline.load(index_fn)
+    result["load_items_per_s"] = len(fingerprints) / (time.perf_counter() - start)
+    return result
+
+
+def bench_fingerprint(violations, repeat):
+    make_fingerprint = fingerprint.fingerprint
+
+    def run():
+        for v in violations:
+            make_fingerprint(v)
+
+    result = measure(run, len(violations), repeat)
+    result["alloc_bytes_per_item"] = per_item_bytes(make_fingerprint, violations[:1000])
+    return result
+
+
+def bench_converter(violations, line_format, repeat, tmpdir):
+    converter = load_converter()
+    input_fn = os.path.join(tmpdir, "input.txt")
+    with open(input_fn, "w") as fp:
+        fp.writelines(line_format(v) for v in violations)
+
+    argv = ["report-to-gl-codeclimate.py", "--input-file", input_fn,
+            "--output-file", os.devnull]
+
+    def run():
+        with unittest.mock.patch.object(sys, "argv", argv):
+            converter.main()
+
+    return measure(run, len(violations), repeat)
+
+
+def run_suite(options):
+    codes, weights = CODES, None
+    if options.codes:
+        codes, weights = parse_distribution(options.codes)
+
+    violations = make_violations(options.count, codes, weights, options.per_file)
+    results = {}
+    with tempfile.TemporaryDirectory() as tmpdir:
+        benchmarks = [
+            ("formatter", lambda: bench_formatter(violations, options.repeat)),
+            ("formatter-dense", lambda: bench_formatter(
+                make_violations(options.count, codes, weights, DENSE_PER_FILE),
+                options.repeat)),
+            ("formatter-dense-root", lambda: bench_formatter(
+                make_violations(options.count, codes, weights, DENSE_PER_FILE),
+                options.repeat, gl_codeclimate_root=os.path.dirname(tmpdir))),
+            ("formatter-sort", lambda: bench_formatter(
+                violations, options.repeat, gl_codeclimate_sort=True,
+                gl_codeclimate_sort_buffer=options.count // 10)),
+            ("output-json", lambda: bench_output(
+                violations, os.path.join(tmpdir, "report.json"), False, options.repeat)),
+            ("output-compact", lambda: bench_output(
+                violations, os.path.join(tmpdir, "report.json"), True, options.repeat)),
+            ("output-gzip", lambda: bench_output(
+                violations, os.path.join(tmpdir, "report.json.gz"), False, options.repeat)),
+            ("output-gzip-compact", lambda: bench_output(
+                violations, os.path.join(tmpdir, "report.json.gz"), True, options.repeat)),
+            ("output-zstd-compact", lambda: bench_output(
+                violations, os.path.join(tmpdir, "report.json.zst"), True, options.repeat)),
+            ("output-slow-sink", lambda: bench_slow_sink(
+                violations, False, options.repeat)),
+            ("output-slow-sink-async", lambda: bench_slow_sink(
+                violations, True, options.repeat)),
+            ("fingerprint", lambda: bench_fingerprint(violations, options.repeat)),
+            ("baseline", lambda: bench_baseline(violations, options.repeat, tmpdir)),
+            ("converter-default", lambda: bench_converter(
+                violations, default_format, options.repeat, tmpdir)),
+            ("converter-pylint", lambda: bench_converter(
+                violations, pylint_format, options.repeat, tmpdir)),
+        ]
+        for name, bench in benchmarks:
+            if options.only and name not in options.only:
+                continue
+            if name.startswith("output-zstd") and not have_zstd():
+                continue
+            results[name] = bench()
+            print("{:<20} {}".format(name, format_metrics(results[name])), file=sys.stderr)
+
+    data = {
+        "meta": {
+            "python": platform.python_version(),
+            "count": options.count,
+            "per_file": options.per_file,
+            "codes": options.codes,
+        },
+        "results": results,
+    }
+    with contextlib.ExitStack() as stack:
+        fp = sys.stdout
+        if options.output:
+            fp = stack.enter_context(open(options.output, "w"))  # noqa: SIM115
+        json.dump(data, fp, indent=2, sort_keys=True)
+        fp.write("\n")
+
+
+def format_metrics(metrics):
+    return "  ".join("{}={:.0f}".format(k, v) for k, v in sorted(metrics.items()))
+
+
+def regression(metric, baseline, current):
+    """
+    Relative regression of current compared to baseline, negative if
+    current is better.
+    """
+    if metric.endswith("_per_s"):
+        return (baseline - current) / baseline
+    return (current - baseline) / baseline if baseline else 0.0
+
+
+def compare(options):
+    with open(options.baseline) as fp:
+        baseline = json.load(fp)
+    with open(options.current) as fp:
+        current = json.load(fp)
+
+    if baseline["meta"] != current["meta"]:
+        print("warning: runs used different parameters: {} vs {}".format(
+            baseline["meta"], current["meta"]), file=sys.stderr)
+
+    failed = False
+    for name, metrics in sorted(baseline["results"].items()):
+        for metric, value in sorted(metrics.items()):
+            try:
+                new_value = current["results"][name][metric]
+            except KeyError:
+                continue
+            change = regression(metric, value, new_value)
+            status = "ok"
+            if change > options.threshold:
+                status = "REGRESSION"
+                failed = True
+            print("{:<20} {:<22} {:>14.0f} {:>14.0f} {:>+8.1%}  {}".format(
+                name, metric, value, new_value, change, status))
+
+    return 1 if failed else 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    run_parser = subparsers.add_parser("run", help="Run the benchmarks.")
+    run_parser.add_argument("--count", type=int, default=100000,
+                            help="Number of violations.")
+    run_parser.add_argument("--per-file", type=int, default=100,
+                            help="Number of violations per file.")
+    run_parser.add_argument("--codes", type=str, default=None,
+                            help="Code distribution, e.g. E501=10,F401=2,W291=1.")
+    run_parser.add_argument("--repeat", type=int, default=3)
+    run_parser.add_argument("--only", action="append",
+                            help="Only run the given benchmark.")
+    run_parser.add_argument("--output", type=str, help="Write results to this file.")
+
+    compare_parser = subparsers.add_parser("compare", help="Compare two runs.")
+    compare_parser.add_argument("baseline")
+    compare_parser.add_argument("current")
+    compare_parser.add_argument("--threshold", type=float, default=0.15,
+                                help="Allowed relative regression. (Default: %(default)s)")
+
+    options = parser.parse_args()
+    if options.command == "run":
+        run_suite(options)
+    else:
+        sys.exit(compare(options))
+
+
+if __name__ == "__main__":
+    main()
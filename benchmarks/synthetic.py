@@ -0,0 +1,53 @@
+"""
+Synthetic flake8 violations for the benchmarks.
+"""
+import random
+
+from flake8.style_guide import Violation
+
+
+CODES = ["E302", "E501", "W291", "F401", "F821", "C901", "D100", "S102", "X111"]
+
+
+def parse_distribution(spec):
+    """
+    Parse a code distribution like "E501=5,F401=1" into codes and weights.
+
+    >>> parse_distribution("E501=5,F401")
+    (['E501', 'F401'], [5.0, 1.0])
+    """
+    codes, weights = [], []
+    for item in spec.split(","):
+        code, _, weight = item.partition("=")
+        codes.append(code.strip())
+        weights.append(float(weight or 1))
+    return codes, weights
+
+
+def make_violations(count, codes=CODES, weights=None, per_file=100, seed=0):
+    """
+    Make count violations, per_file of them in each file, with codes
+    drawn from codes according to weights.
+    """
+    rng = random.Random(seed)  # noqa: S311
+    drawn = rng.choices(codes, weights=weights, k=count)
+    return [
+        Violation(
+            code=code,
+            filename="./src/module_{}.py".format(i // per_file),
+            line_number=i % per_file + 1,
+            column_number=rng.randint(1, 80),
+            text="Some violation text with a number {}".format(i),
+            physical_line=None,
+        )
+        for i, code in enumerate(drawn)
+    ]
+
+
+def default_format(v):
+    return "{}:{}:{}: {} {}\n".format(
+        v.filename, v.line_number, v.column_number, v.code, v.text)
+
+
+def pylint_format(v):
+    return "{}:{}: [{}] {}\n".format(v.filename, v.line_number, v.code, v.text)
@@ -1,57 +1,236 @@
-import hashlib
+import collections
 import json
+import os
+import sys
+import time
+from json.encoder import encode_basestring_ascii
 
 from flake8.formatting.base import BaseFormatter
-from flake8.plugins.pyflakes import FLAKE8_PYFLAKES_CODES
 
-from mccabe import McCabeChecker
+from . import compression, fingerprint, serializer
 
-PYFLAKE_CODES = frozenset(FLAKE8_PYFLAKES_CODES.values())
-MCCABE_CODES = frozenset([McCabeChecker._code])
+# Number of characters collected in memory before handing them to write()
+DEFAULT_BUFFER_SIZE = 64 * 1024
 
 
-class GitlabCodeClimateFormatter(BaseFormatter):
+# Code prefixes of well known plugins, the longest matching prefix wins.
+CHECK_NAME_PREFIXES = {
+    "D": "pydocstyle",
+    "E": "pycodestyle",
+    "W": "pycodestyle",
+    "G": "logging-format",
+    "I": "import-order",
+    "R": "radon",
+    "SIM": "simplify",
+    "S": "bandit",
+}
+
+STYLE_CHECKS = frozenset(["import-order", "pycodestyle", "pydocstyle", "simplify"])
+
+
+def _exact_codes():
     """
-    A formatter implementation aimed to produce codeclimate issues
-    as expected by Gitlab...
+    Codes of pyflakes and mccabe by check name.
+
+    Importing pyflakes' checker and mccabe is comparatively expensive,
+    so this is only done once the first code is classified. The result
+    is stored as the module's PYFLAKE_CODES and MCCABE_CODES.
     """
-    @classmethod
-    def _make_fingerprint(cls, v):
-        b = bytes(" ".join([str(getattr(v, f)) for f in v._fields]), "utf-8")
-        return hashlib.sha1(b).hexdigest()  # noqa: S324
+    module = globals()
+    if "PYFLAKE_CODES" not in module:
+        from flake8.plugins.pyflakes import FLAKE8_PYFLAKES_CODES
+        from mccabe import McCabeChecker
+
+        module["PYFLAKE_CODES"] = frozenset(FLAKE8_PYFLAKES_CODES.values())
+        module["MCCABE_CODES"] = frozenset([McCabeChecker._code])
+
+    return {"pyflakes": module["PYFLAKE_CODES"], "mccabe": module["MCCABE_CODES"]}
+
+
+def __getattr__(name):
+    # PYFLAKE_CODES and MCCABE_CODES are resolved on first access.
+    if name in ("PYFLAKE_CODES", "MCCABE_CODES"):
+        _exact_codes()
+        return globals()[name]
+
+    raise AttributeError("module {!r} has no attribute {!r}".format(__name__, name))
+
+
+SEVERITIES = ("info", "minor", "major", "critical", "blocker")
+
+CATEGORIES = (
+    "Bug Risk",
+    "Clarity",
+    "Compatibility",
+    "Complexity",
+    "Duplication",
+    "Performance",
+    "Security",
+    "Style",
+)
+
+
+class PrefixTable(dict):
+    """
+    Values by code prefix, looked up by the longest prefix of a code.
+
+    >>> PrefixTable({"E": 1, "E5": 2}).lookup("E501")
+    2
+    """
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._lengths = sorted({len(p) for p in self}, reverse=True)
+
+    def lookup(self, code):
+        for length in self._lengths:
+            value = self.get(code[:length])
+            if value is not None:
+                return value
+
+        return None
+
+
+def parse_prefix_mapping(values, option, choices=None, sep=None):
+    """
+    Parse PREFIX=VALUE items of an option into a dict.
+
+    values is a list or a string with comma or newline separated items.
+    With sep, every value is split into a tuple. With choices, values not
+    in choices raise a ValueError.
+
+    >>> parse_prefix_mapping(["B=bugbear", " N8 = pep8-naming"], "--x")
+    {'B': 'bugbear', 'N8': 'pep8-naming'}
+    >>> parse_prefix_mapping("E5=Style|Bug Risk,\\nW=Style", "--x", sep="|")
+    {'E5': ('Style', 'Bug Risk'), 'W': ('Style',)}
+    """
+    if isinstance(values, str):
+        values = values.replace("\n", ",").split(",")
+
+    result = {}
+    for item in values:
+        if not item.strip():
+            continue
+
+        prefix, eq, value = item.partition("=")
+        prefix, value = prefix.strip(), value.strip()
+        if not eq or not prefix or not value:
+            raise ValueError("{}: expected PREFIX=VALUE, got {!r}".format(option, item))
+
+        parts = tuple(v.strip() for v in value.split(sep)) if sep else (value,)
+        for part in parts:
+            if choices is not None and part not in choices:
+                raise ValueError("{}: invalid value {!r} for {}, expected one of {}".format(
+                    option, part, prefix, ", ".join(choices)))
+
+        result[prefix] = parts if sep else value
+
+    return result
+
+
+Classification = collections.namedtuple("Classification", [
+    "check_name",
+    "categories",
+    "severity",
+])
+
+
+IssueTemplate = collections.namedtuple("IssueTemplate", [
+    "head",  # up to and including the "description" key
+    "middle",  # from categories up to and including the "path" key
+    "tail",  # the fingerprint's closing quote and severity
+])
+
+
+class Issue:
+    """
+    The fields of a violation needed to serialize it as an issue.
+
+    For modes keeping issues around until the end (sorting, aggregation),
+    a fraction of the size of the serialized issue. Codes and filenames
+    are interned, so every distinct one is only stored once. The attribute
+    names match Violation's, so that the formatter can serialize either.
+    """
+    __slots__ = ("code", "filename", "line_number", "text", "fingerprint")
+
+    def __init__(self, code, filename, line_number, text, fingerprint=None):
+        self.code = sys.intern(code)
+        self.filename = sys.intern(filename)
+        self.line_number = line_number
+        self.text = text
+        self.fingerprint = fingerprint
 
     @classmethod
-    def _guess_check_name(cls, v):
-        if v.code in MCCABE_CODES:
-            return "mccabe"
-        elif v.code in PYFLAKE_CODES:
-            return "pyflakes"
-        elif v.code.startswith("D"):
-            return "pydocstyle"
-        elif v.code.startswith("E") or v.code.startswith("W"):
-            return "pycodestyle"
-        elif v.code.startswith("G"):
-            return "logging-format"
-        elif v.code.startswith("I"):
-            return "import-order"
-        elif v.code.startswith("R"):
-            return "radon"
-        elif v.code.startswith("SIM"):
-            return "simplify"
-        elif v.code.startswith("S"):
-            return "bandit"
-
-        # TODO: Check the flake8 extensions entrypoint - it should list
-        #       error code that extensions are using...
-        #
-        #       Hmm, except flake8-logging-format does not use
-        #           G = logging_format.api:LoggingFormatValidator
-        #       And even if it would, we would still need to do some magic
-        #       matching...
+    def from_violation(cls, v, fingerprint=None):
+        return cls(v.code, v.filename, v.line_number, v.text, fingerprint)
+
+
+class CodeClassifier:
+    """
+    Resolve check name, categories and severity of a violation code.
+
+    Codes are first looked up in the user provided check_names, then in a
+    table of exact codes (pyflakes, mccabe), by their longest known prefix
+    and finally by the entry points of installed plugins. User provided
+    severities and categories by code prefix take precedence over the
+    guessed ones. Results are memoized per code, reports usually contain
+    few distinct codes, but many violations.
+    """
+    def __init__(self, check_names=None, severities=None, categories=None):
+        self._exact = None  # built on first use, see _exact_codes()
+        self._prefixes = PrefixTable(CHECK_NAME_PREFIXES)
+        self._check_names = PrefixTable(check_names or {})
+        self._severities = PrefixTable(severities or {})
+        self._categories = PrefixTable(categories or {})
+        self._plugins = None  # loaded on the first unknown code, see registry
+        self._cache = {}
+
+    def classify(self, code):
+        result = self._cache.get(code)
+        if result is not None:
+            return result
+
+        check_name = self.check_name(code)
+        result = Classification(
+            check_name,
+            self._categories.lookup(code) or self.categories(check_name),
+            self._severities.lookup(code) or self.severity(code),
+        )
+        self._cache[code] = result
+        return result
+
+    def check_name(self, code):
+        check_name = self._check_names.lookup(code)
+        if check_name is not None:
+            return check_name
+
+        if self._exact is None:
+            self._exact = {
+                code: check_name
+                for check_name, codes in _exact_codes().items()
+                for code in codes
+            }
+
+        check_name = self._exact.get(code)
+        if check_name is not None:
+            return check_name
+
+        check_name = self._prefixes.lookup(code)
+        if check_name is not None:
+            return check_name
+
+        # Codes of other plugins by the entry points they are registered with.
+        if self._plugins is None:
+            from . import registry
+
+            self._plugins = PrefixTable(registry.load(registry.default_cache_path()))
+
+        check_name = self._plugins.lookup(code)
+        if check_name is not None:
+            return check_name
+
         return "unknown"
 
-    @classmethod
-    def _guess_categories(cls, v):
+    def categories(self, check_name):
         """
         Try to guess the category the violation falls in.
 
@@ -69,10 +248,8 @@ class GitlabCodeClimateFormatter(BaseFormatter):
         TODO: This isn't really implemented.
         """
         result = []
-        check_name = cls._guess_check_name(v)
-        style_checks = {"import-order", "pycodestyle", "pydocstyle", "simplify"}
 
-        if check_name in style_checks:
+        if check_name in STYLE_CHECKS:
             result.append("Style")
         if check_name == "simplify":
             result.append("Clarity")
@@ -85,10 +262,9 @@ class GitlabCodeClimateFormatter(BaseFormatter):
         if not result:
             result.append("Bug Risk")
 
-        return result
+        return tuple(result)
 
-    @classmethod
-    def _guess_severity(cls, v):
+    def severity(self, code):
         """
         Try to guess the severity of the violation.
 
@@ -100,32 +276,217 @@ class GitlabCodeClimateFormatter(BaseFormatter):
             "blocker"
         }
         """
-        if v.code.startswith("E"):  # error
+        if code.startswith("E"):  # error
             return "major"
-        if v.code.startswith("S"):  # security
+        if code.startswith("S"):  # security
             return "critical"
 
         return "minor"
 
+
+class GitlabCodeClimateFormatter(BaseFormatter):
+    """
+    A formatter implementation aimed to produce codeclimate issues
+    as expected by Gitlab...
+    """
+    # Write one issue per line instead of a JSON array.
+    json_lines = False
+
+    @classmethod
+    def add_options(cls, parser):
+        # Not imported at module level, so that running the module with
+        # python -m doesn't import it twice.
+        from . import aggregate, cache, sort
+
+        parser.add_option(
+            "--gl-codeclimate-buffer-size",
+            type=int,
+            default=DEFAULT_BUFFER_SIZE,
+            parse_from_config=True,
+            help="Number of characters to buffer before writing issues "
+                 "out. Use 0 to write every issue immediately. "
+                 "(Default: %(default)s)",
+        )
+        parser.add_option(
+            "--gl-codeclimate-compact",
+            action="store_true",
+            default=False,
+            parse_from_config=True,
+            help="Write issues without newlines and indentation. Output "
+                 "files ending in .gz or .zst are always compressed.",
+        )
+        parser.add_option(
+            "--gl-codeclimate-async-write",
+            action="store_true",
+            default=False,
+            parse_from_config=True,
+            help="Write the report from a background thread, so that slow "
+                 "output files don't hold up handling further issues.",
+        )
+        parser.add_option(
+            "--gl-codeclimate-fingerprint",
+            choices=sorted(fingerprint.ALGORITHMS),
+            default=fingerprint.DEFAULT_ALGORITHM,
+            parse_from_config=True,
+            help="Hash algorithm for issue fingerprints. Changing it changes "
+                 "all fingerprints once. (Default: %(default)s)",
+        )
+        parser.add_option(
+            "--gl-codeclimate-json",
+            choices=["template", "auto"] + sorted(serializer.BACKENDS),
+            default="template",
+            parse_from_config=True,
+            help="How to serialize issues: template uses pre-serialized "
+                 "parts of issues per code and is the fastest, auto uses "
+                 "orjson or ujson if installed and the standard library "
+                 "otherwise. (Default: %(default)s)",
+        )
+        parser.add_option(
+            "--gl-codeclimate-check-names",
+            default=None,
+            parse_from_config=True,
+            metavar="PREFIX=NAME",
+            help="Comma separated check names for code prefixes, taking "
+                 "precedence over the built-in and plugin provided names, "
+                 "e.g. B=bugbear,N8=pep8-naming.",
+        )
+        parser.add_option(
+            "--gl-codeclimate-severities",
+            default=None,
+            parse_from_config=True,
+            metavar="PREFIX=SEVERITY",
+            help="Comma separated severities for code prefixes, one of {}, "
+                 "e.g. E9=blocker,W=info.".format(", ".join(SEVERITIES)),
+        )
+        parser.add_option(
+            "--gl-codeclimate-categories",
+            default=None,
+            parse_from_config=True,
+            metavar="PREFIX=CATEGORY|...",
+            help="Comma separated categories for code prefixes, multiple "
+                 "categories separated by |, e.g. "
+                 "'B=Bug Risk,SIM=Clarity|Style'.",
+        )
+        parser.add_option(
+            "--gl-codeclimate-aggregate",
+            action="store_true",
+            default=False,
+            parse_from_config=True,
+            help="Report all violations of a code in a file as a single "
+                 "issue, listing the other occurrences as other_locations.",
+        )
+        parser.add_option(
+            "--gl-codeclimate-aggregate-max-locations",
+            type=int,
+            default=aggregate.DEFAULT_MAX_LOCATIONS,
+            parse_from_config=True,
+            help="Maximum number of other_locations of an aggregated issue, "
+                 "further occurrences are only counted. (Default: %(default)s)",
+        )
+        parser.add_option(
+            "--gl-codeclimate-baseline",
+            default=None,
+            parse_from_config=True,
+            normalize_paths=True,
+            help="Only report issues whose fingerprint is not in this "
+                 "report or index, see flake8-gl-codeclimate-baseline.",
+        )
+        parser.add_option(
+            "--gl-codeclimate-baseline-mode",
+            choices=["skip", "mark"],
+            default="skip",
+            parse_from_config=True,
+            help="Whether to skip issues of the baseline or to report them "
+                 "with severity info. (Default: %(default)s)",
+        )
+        parser.add_option(
+            "--gl-codeclimate-root",
+            default=None,
+            parse_from_config=True,
+            normalize_paths=True,
+            help="Report paths relative to this directory, usually the root "
+                 "of the repository, instead of as given to flake8.",
+        )
+        parser.add_option(
+            "--gl-codeclimate-sort",
+            action="store_true",
+            default=False,
+            parse_from_config=True,
+            help="Sort issues by path, line and code, so that the same "
+                 "issues always result in the same report.",
+        )
+        parser.add_option(
+            "--gl-codeclimate-sort-buffer",
+            type=int,
+            default=sort.DEFAULT_MAX_ITEMS,
+            parse_from_config=True,
+            help="Number of issues kept in memory for sorting, further "
+                 "issues are sorted in temporary files. (Default: %(default)s)",
+        )
+        parser.add_option(
+            "--gl-codeclimate-stable-fingerprints",
+            action="store_true",
+            default=False,
+            parse_from_config=True,
+            help="Compute fingerprints from the content of the offending "
+                 "line instead of its location, so that adding or removing "
+                 "lines does not change the fingerprints of unrelated issues.",
+        )
+        parser.add_option(
+            "--gl-codeclimate-cache",
+            default=None,
+            parse_from_config=True,
+            normalize_paths=True,
+            help="Cache the issues of every file in this file and report "
+                 "the cached issues of unchanged files that were not "
+                 "checked. See flake8-gl-codeclimate-changed.",
+        )
+        parser.add_option(
+            "--gl-codeclimate-cache-size",
+            type=int,
+            default=cache.DEFAULT_MAX_ENTRIES,
+            parse_from_config=True,
+            help="Maximum number of files kept in the cache. "
+                 "(Default: %(default)s)",
+        )
+        parser.add_option(
+            "--gl-codeclimate-stats",
+            default=None,
+            metavar="PATH",
+            help="Time the stages of producing the report and count issues "
+                 "per check. The summary is written to PATH as JSON, or to "
+                 "stderr for -. Can also be enabled through the "
+                 "FLAKE8_GL_CODECLIMATE_STATS environment variable.",
+        )
+
     @classmethod
-    def _violation_to_codeclimate_issue(cls, v):
+    def _make_path(cls, filename):
+        return filename[2:] if filename.startswith("./") else filename
+
+    def _violation_to_codeclimate_issue(self, v, digest=None):
         """
         Given a Violation/error, create a codeclimate issue.
 
+        digest is the violation's fingerprint, if already computed.
+
         This is pretty basic for now - the idea to only support the subset
         that Gitlab is actually interested in.
 
         https://docs.gitlab.com/ee/user/project/merge_requests/code_quality.html#how-it-works  # noqa
         """
+        classification = self.classifier.classify(v.code)
+        if v.filename != self.__filename:
+            self._set_filename(v.filename)
+
         return {
             "type": "issue",
-            "check_name": cls._guess_check_name(v),
+            "check_name": classification.check_name,
             "description": "{} [{}]".format(v.text, v.code),
             # "content": content -- Optional. A markdown snippet describing the
             # issue, including deeper explanations and links to other resources.
-            "categories": cls._guess_categories(v),
+            "categories": list(classification.categories),
             "location": {
-                "path": v.filename[2:] if v.filename.startswith("./") else v.filename,
+                "path": self.__path,
                 "lines": {
                     "begin": v.line_number,
                     "end": v.line_number,
@@ -136,16 +497,277 @@ class GitlabCodeClimateFormatter(BaseFormatter):
             # remediation_points -- Optional. An integer indicating a rough
             #                       estimate of how long it would take to resolve
             #                       the reported issue.
-            "fingerprint": cls._make_fingerprint(v),
+            "fingerprint": digest or self.__fingerprint(v),
             # severity -- Required. A Severity string (info, minor, major,
             #             critical, or blocker) describing the potential impact
             #             of the issue found. Use minor by default.
-            "severity": cls._guess_severity(v),
+            "severity": classification.severity,
+        }
+
+    def _make_issue_template(self, code):
+        """
+        Pre-serialize the parts of an issue that only depend on the code.
+
+        Joined with the JSON encoded description, path, line and fingerprint,
+        this produces the same output as json.dumps() on the result of
+        _violation_to_codeclimate_issue().
+        """
+        classification = self.classifier.classify(code)
+        return IssueTemplate(
+            head='{"type": "issue", "check_name": %s, "description": ' % (
+                json.dumps(classification.check_name)),
+            middle=', "categories": %s, "location": {"path": ' % (
+                json.dumps(list(classification.categories))),
+            tail='", "severity": %s}' % json.dumps(classification.severity),
+        )
+
+    def _violation_to_json(self, v, digest=None):
+        """
+        Serialize a violation using the memoized template of its code.
+        """
+        template = self.__templates.get(v.code)
+        if template is None:
+            template = self.__templates[v.code] = self._make_issue_template(v.code)
+
+        if v.filename != self.__filename:
+            self._set_filename(v.filename)
+
+        line = str(v.line_number)
+        return "".join([
+            template.head,
+            encode_basestring_ascii("{} [{}]".format(v.text, v.code)),
+            template.middle,
+            self.__path_json,
+            line, ', "end": ', line,
+            '}}, "fingerprint": "',
+            digest or self.__fingerprint(v),
+            template.tail,
+        ])
+
+    def _issue_to_json(self, issue):
+        """
+        Serialize an Issue record with its stored fingerprint.
+        """
+        return self._violation_to_json(issue, issue.fingerprint)
+
+    def _serialized(self, issue):
+        """
+        issue serialized, if it is an Issue record rather than serialized
+        already.
+        """
+        if isinstance(issue, Issue):
+            return self._issue_to_json(issue)
+        return issue
+
+    def _violation_to_json_dumps(self, v, digest=None):
+        """
+        Serialize a violation with the configured JSON backend.
+        """
+        return self.__dumps(self._violation_to_codeclimate_issue(v, digest))
+
+    def _resolve_path(self, filename):
+        """
+        The path of filename as reported in issues, relative to the root
+        given with --gl-codeclimate-root. Memoized per filename.
+        """
+        path = self.__paths.get(filename)
+        if path is None:
+            if self.__root is None:
+                path = self._make_path(filename)
+            else:
+                path = os.path.relpath(os.path.realpath(filename), self.__root)
+                if os.sep != "/":
+                    path = path.replace(os.sep, "/")
+            self.__paths[filename] = path
+
+        return path
+
+    def _group_to_codeclimate_issue(self, group):
+        """
+        Create a single codeclimate issue for a group of violations with
+        the same code in a file.
+
+        The first violation is the issue's location, the others are listed
+        as other_locations, up to the group's limit.
+        """
+        v = group.first
+        classification = self.classifier.classify(v.code)
+        path = self._resolve_path(v.filename)
+        description = "{} [{}]".format(v.text, v.code)
+        if group.count > 1:
+            description += " ({} occurrences".format(group.count)
+            if len(group.lines) < group.count - 1:
+                description += ", {} listed".format(len(group.lines) + 1)
+            description += ")"
+
+        return {
+            "type": "issue",
+            "check_name": classification.check_name,
+            "description": description,
+            "categories": list(classification.categories),
+            "location": {
+                "path": path,
+                "lines": {
+                    "begin": v.line_number,
+                    "end": v.line_number,
+                },
+            },
+            "other_locations": [
+                {"path": path, "lines": {"begin": line, "end": line}}
+                for line in group.lines
+            ],
+            "fingerprint": self.__group_fingerprint(v.code, path),
+            "severity": classification.severity,
         }
 
     def after_init(self):
         self.__error_written = False  # was an error printed
-        self.__indent = 4 * " "
+        # Whitespace before every issue and before the closing bracket.
+        self.__compact = getattr(self.options, "gl_codeclimate_compact", False)
+        self.__indent = "" if self.__compact else self.newline + 4 * " "
+        # Not all users of the formatter go through flake8's option
+        # handling (scripts/report-to-gl-codeclimate.py), use a default.
+        self.__buffer_size = getattr(self.options, "gl_codeclimate_buffer_size",
+                                     DEFAULT_BUFFER_SIZE)
+        self.__buffer = []
+        self.__buffered = 0  # number of characters in self.__buffer
+        self.__writer = None
+        if getattr(self.options, "gl_codeclimate_async_write", False):
+            from . import writer
+
+            self.__writer = writer.AsyncWriter(self.write)
+            self.write = self.__writer.write
+        self.__templates = {}  # code -> IssueTemplate
+        root = getattr(self.options, "gl_codeclimate_root", None)
+        self.__root = os.path.realpath(root) if root else None
+        self.__paths = {}  # filename -> path in issues
+        self._set_filename("")
+        check_names = getattr(self.options, "gl_codeclimate_check_names", None)
+        severities = getattr(self.options, "gl_codeclimate_severities", None)
+        categories = getattr(self.options, "gl_codeclimate_categories", None)
+        self.classifier = CodeClassifier(
+            parse_prefix_mapping(check_names or [], "--gl-codeclimate-check-names"),
+            parse_prefix_mapping(severities or [], "--gl-codeclimate-severities",
+                                 choices=SEVERITIES),
+            parse_prefix_mapping(categories or [], "--gl-codeclimate-categories",
+                                 choices=CATEGORIES, sep="|"),
+        )
+        backend = getattr(self.options, "gl_codeclimate_json", "template")
+        self.__dumps = json.dumps  # for aggregated issues
+        if backend != "template":
+            self.__dumps = serializer.get_dumps(backend)
+            self._violation_to_json = self._violation_to_json_dumps
+        algorithm = getattr(self.options, "gl_codeclimate_fingerprint",
+                            fingerprint.DEFAULT_ALGORITHM)
+        self.__source_lines = None
+        if getattr(self.options, "gl_codeclimate_stable_fingerprints", False):
+            source_lines = fingerprint.SourceLineFingerprinter(algorithm)
+            resolve_path = self._resolve_path
+
+            def stable_fingerprint(v):
+                # The path as reported, so that fingerprints don't depend
+                # on where flake8 runs with --gl-codeclimate-root.
+                return source_lines(v, resolve_path(v.filename))
+
+            self.__source_lines = source_lines
+            self.__fingerprint = stable_fingerprint
+        else:
+            self.__fingerprint = fingerprint.make_fingerprinter(algorithm)
+
+        self.__aggregator = None
+        if getattr(self.options, "gl_codeclimate_aggregate", False):
+            from . import aggregate
+
+            self.__aggregator = aggregate.Aggregator(getattr(
+                self.options, "gl_codeclimate_aggregate_max_locations",
+                aggregate.DEFAULT_MAX_LOCATIONS))
+            self.__group_fingerprint = fingerprint.make_group_fingerprinter(algorithm)
+            self.handle = self._handle_aggregated
+
+        self.__baseline = None
+        baseline_path = getattr(self.options, "gl_codeclimate_baseline", None)
+        if baseline_path:
+            from . import baseline
+
+            self.__baseline = baseline.load(baseline_path)
+            self.__baseline_mode = getattr(self.options, "gl_codeclimate_baseline_mode",
+                                           "skip")
+            if self.__aggregator is None:
+                self.handle = self._handle_baseline
+
+        self.__sorter = None
+        if getattr(self.options, "gl_codeclimate_sort", False):
+            from . import sort
+
+            # Records only save memory, spilled runs keep serialized issues,
+            # which are faster to write and read back.
+            self.__sorter = sort.ExternalSorter(
+                self._sort_key,
+                getattr(self.options, "gl_codeclimate_sort_buffer", sort.DEFAULT_MAX_ITEMS),
+                spill=self._serialized,
+            )
+            if self.__aggregator is None and self.__baseline is None:
+                self.handle = self._handle_sorted
+
+        self.__cache = None
+        cache_path = getattr(self.options, "gl_codeclimate_cache", None)
+        if cache_path:
+            from . import cache
+
+            self.__cache = cache.ReportCache(
+                cache_path,
+                cache.version_key(self.options),
+                getattr(self.options, "gl_codeclimate_cache_size",
+                        cache.DEFAULT_MAX_ENTRIES),
+            )
+        self.__seen = set()  # files reported by flake8 in this run
+        self.__file_issues = None  # serialized issues of the current file
+
+        self.__stats = None
+        self.__stats_path = getattr(self.options, "gl_codeclimate_stats", None)
+        if not self.__stats_path:
+            self.__stats_path = os.environ.get("FLAKE8_GL_CODECLIMATE_STATS")
+        if self.__stats_path:
+            self._instrument()
+
+    def _instrument(self):
+        """
+        Replace the stages of handling a violation with timed versions.
+
+        Classification happens once per distinct code when its issue
+        template is created. Serialization includes the fingerprint.
+        """
+        from . import stats
+
+        self.__stats = stats.Stats()
+        self.__init_time = time.perf_counter()
+        timed = self.__stats.timed
+        self._make_issue_template = timed("classify", self._make_issue_template)
+        self.__fingerprint = timed("fingerprint", self.__fingerprint)
+        self._violation_to_json = timed("serialize", self._violation_to_json)
+        self.write = timed("write", self.write)
+
+        handle = self.handle
+        check_names = self.__stats.check_names
+        classify = self.classifier.classify
+
+        def counting_handle(error):
+            check_names[classify(error.code).check_name] += 1
+            handle(error)
+
+        self.handle = timed("handle", counting_handle)
+
+        # Count issues actually written, not those skipped by the baseline,
+        # merged by aggregation or only passed to the sorter yet.
+        stats = self.__stats
+        write_issue = self._write_issue
+
+        def counting_write_issue(issue):
+            if self.__sorter is None:
+                stats.issues += 1
+            write_issue(issue)
+
+        self._write_issue = counting_write_issue
 
     def write(self, line, source=None):
         """
@@ -157,23 +779,238 @@ class GitlabCodeClimateFormatter(BaseFormatter):
         if self.output_fd is None or self.options.tee:
             print(line, end="")
 
+    def _set_filename(self, filename):
+        """
+        Prepare the parts of issues that only depend on the filename.
+
+        Violations arrive grouped by file, so this happens once per file,
+        either in beginning() or on the first violation of another file
+        for users of the formatter that don't call beginning().
+        """
+        self.__filename = filename
+        self.__path = self._resolve_path(filename)
+        self.__path_json = encode_basestring_ascii(self.__path) + ', "lines": {"begin": '
+
+    def beginning(self, filename):
+        self._set_filename(filename)
+        if self.__cache is not None:
+            self.__file_issues = []
+
+    def finished(self, filename):
+        # flake8 reports all violations of a file in one go, the file's
+        # lines are not needed anymore.
+        if self.__source_lines is not None:
+            self.__source_lines.forget(filename)
+
+        if self.__aggregator is not None:
+            self._write_groups(self.__aggregator.flush())
+
+        if self.__cache is not None:
+            self.__cache.store(filename, self.__file_issues)
+            self.__seen.add(filename)
+            self.__file_issues = None
+
     def start(self):
-        super().start()
-        self.write("[", source=None)
+        if self.__stats is not None:
+            # flake8 runs all checks between creating and starting the formatter.
+            self.__stats.add("checks", time.perf_counter() - self.__init_time)
+
+        if self.filename and compression.is_compressed(self.filename):
+            dirname = os.path.dirname(os.path.abspath(self.filename))
+            os.makedirs(dirname, exist_ok=True)
+            self.output_fd = compression.open_output(self.filename)
+        else:
+            super().start()
+
+        if self.__writer is not None:
+            self.__writer.start()
+
+        if not self.json_lines:
+            self.write("[", source=None)
+        if self.__cache is not None:
+            self.__cache.load()
+
+    def flush(self):
+        """
+        Write out all buffered issues with a single call to write().
+        """
+        if self.__buffer:
+            self.write("".join(self.__buffer))
+            self.__buffer.clear()
+            self.__buffered = 0
 
     def stop(self):
-        if self.__error_written:
-            self.write(self.newline)
+        try:
+            self._write_remaining()
+        finally:
+            # Also when writing failed, so that the writer thread ends and
+            # the output file is closed.
+            try:
+                if self.__writer is not None:
+                    self.__writer.close()
+            finally:
+                super().stop()
 
-        self.write("]" + self.newline)
-        super().stop()
+        if self.__stats is not None:
+            self.__stats.report(self.__stats_path)
 
-    def handle(self, error):
-        if self.__error_written:
-            self.write(",")
+    def _write_remaining(self):
+        """
+        Write the issues kept until the end and close the array.
+        """
+        if self.__aggregator is not None:
+            self._write_groups(self.__aggregator.flush())
+
+        if self.__cache is not None:
+            for issue in self.__cache.replay(self.__seen):
+                self._write_issue(issue)
+            self.__cache.save()
+
+        if self.__sorter is not None:
+            sorter, self.__sorter = self.__sorter, None
+            try:
+                to_json = self._violation_to_json
+                for issue in sorter:
+                    if issue.__class__ is Issue:
+                        issue = to_json(issue, issue.fingerprint)
+                    self._write_issue(issue)
+            finally:
+                sorter.close()
 
-        # Indent
-        self.write(self.newline + self.__indent)
-        self.write(json.dumps(self._violation_to_codeclimate_issue(error)))
+        self.flush()
+        if not self.json_lines:
+            if self.__error_written and not self.__compact:
+                self.write(self.newline)
+
+            self.write("]" + self.newline)
+
+    def _write_issue(self, issue):
+        """
+        Write a serialized issue, buffering it if configured.
+        """
+        if self.__sorter is not None:
+            self.__sorter.add(issue)
+            return
+
+        if self.json_lines:
+            chunk = issue + self.newline
+        else:
+            # Separator and indent are prepended to the issue so that
+            # every issue results in a single chunk of output.
+            sep = "," if self.__error_written else ""
+            chunk = sep + self.__indent + issue
 
         self.__error_written = True
+
+        if self.__buffer_size <= 0:
+            self.write(chunk)
+            return
+
+        self.__buffer.append(chunk)
+        self.__buffered += len(chunk)
+        if self.__buffered >= self.__buffer_size:
+            self.flush()
+
+    def handle(self, error):
+        issue = self._violation_to_json(error)
+        if self.__file_issues is not None:
+            self.__file_issues.append(issue)
+
+        self._write_issue(issue)
+
+    def _handle_sorted(self, error):
+        """
+        handle() with --gl-codeclimate-sort, the sort key is known without
+        parsing the serialized issue.
+
+        Until the end, an Issue record is kept rather than the serialized
+        issue, unless the cache keeps the latter anyway.
+        """
+        if self.__file_issues is not None:
+            issue = self._violation_to_json(error)
+            self.__file_issues.append(issue)
+        else:
+            issue = Issue(error.code, error.filename, error.line_number, error.text,
+                          self.__fingerprint(error))
+
+        key = self._resolve_path(error.filename), error.line_number, error.code
+        self.__sorter.add(issue, key)
+
+    @classmethod
+    def _sort_key(cls, issue):
+        """
+        Path, line and code of a serialized issue.
+        """
+        data = json.loads(issue)
+        description = data["description"]  # "text [code]", maybe with a count
+        code = description[description.rfind("[") + 1:description.rfind("]")]
+        location = data["location"]
+        return location["path"], location["lines"]["begin"], code
+
+    def _handle_aggregated(self, error):
+        """
+        handle() with --gl-codeclimate-aggregate, issues are only written
+        once all violations of a file have been seen.
+        """
+        self._write_groups(self.__aggregator.add(error))
+
+    def _handle_baseline(self, error):
+        """
+        handle() with --gl-codeclimate-baseline, violations already in the
+        baseline are skipped or reported with severity info.
+        """
+        digest = self.__fingerprint(error)
+        if digest not in self.__baseline:
+            issue = self._violation_to_json(error, digest)
+        elif self.__baseline_mode == "skip":
+            return
+        else:
+            issue = self._violation_to_codeclimate_issue(error, digest)
+            issue["severity"] = "info"
+            issue = self.__dumps(issue)
+
+        if self.__file_issues is not None:
+            self.__file_issues.append(issue)
+
+        self._write_issue(issue)
+
+    def _write_groups(self, groups):
+        for group in groups:
+            issue = self._group_to_codeclimate_issue(group)
+            if self.__baseline is not None and issue["fingerprint"] in self.__baseline:
+                if self.__baseline_mode == "skip":
+                    continue
+                issue["severity"] = "info"
+
+            issue = self.__dumps(issue)
+            if self.__file_issues is not None:
+                self.__file_issues.append(issue)
+
+            self._write_issue(issue)
+
+
+class GitlabCodeClimateJsonLinesFormatter(GitlabCodeClimateFormatter):
+    """
+    Write codeclimate issues as JSON Lines, one issue per line.
+
+    Unlike the array written by GitlabCodeClimateFormatter, the output of
+    an interrupted run is still usable and further runs can append to it.
+    flake8-gl-codeclimate-finalize turns it into the array Gitlab expects.
+    """
+    json_lines = True
+
+    @classmethod
+    def add_options(cls, parser):
+        # Shared with GitlabCodeClimateFormatter, which registers them.
+        pass
+
+    def start(self):
+        # Don't append the first issue of this run to an incomplete last
+        # line of an interrupted one.
+        filename = self.filename
+        if filename and os.path.isfile(filename) and not compression.is_compressed(filename):
+            from . import jsonl
+
+            jsonl.complete_last_line(filename)
+
+        super().start()
@@ -0,0 +1,63 @@
+"""
+Collapse the violations of a file with the same code into one issue.
+
+Violations are expected to arrive grouped by file, as flake8 reports them.
+Only an Issue record of the first violation of every group is kept, of
+all others just the line numbers, up to max_locations per group, and a
+counter.
+"""
+import array
+
+from . import Issue
+
+DEFAULT_MAX_LOCATIONS = 100
+
+
+class Group:
+    __slots__ = ("first", "lines", "count")
+
+    def __init__(self, first):
+        self.first = first  # Issue of the first violation of the group
+        self.lines = array.array("L")  # lines of the other occurrences
+        self.count = 1
+
+
+class Aggregator:
+    """
+    Group violations of the current file by code.
+    """
+    def __init__(self, max_locations=DEFAULT_MAX_LOCATIONS):
+        self.max_locations = max_locations
+        self.filename = None
+        self.groups = {}  # code -> Group
+
+    def add(self, v):
+        """
+        Add v to its group. Returns the groups of the previous file if v
+        is from another file, an empty list otherwise.
+        """
+        done = []
+        if v.filename != self.filename:
+            done = self.flush()
+            self.filename = v.filename
+
+        group = self.groups.get(v.code)
+        if group is None:
+            self.groups[v.code] = Group(Issue.from_violation(v))
+            return done
+
+        group.count += 1
+        if len(group.lines) < self.max_locations:
+            group.lines.append(v.line_number)
+
+        return done
+
+    def flush(self):
+        """
+        Return the groups of the current file in order of their first
+        violation and start over.
+        """
+        done = list(self.groups.values())
+        self.groups.clear()
+        self.filename = None
+        return done
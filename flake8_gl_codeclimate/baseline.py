@@ -0,0 +1,102 @@
+"""
+Fingerprints of a previous report, to only report new issues.
+
+    $ flake8-gl-codeclimate-baseline --output baseline.idx gl-code-quality-report.json
+    $ flake8 --format gl-codeclimate --gl-codeclimate-baseline baseline.idx ...
+
+The formatter accepts a report as baseline, too, but parsing a large
+report takes seconds. The index is the sorted 64 bit hashes of the
+fingerprints of a report, which are loaded without any parsing and
+searched with bisect.
+"""
+import argparse
+import array
+import bisect
+import hashlib
+import sys
+
+from . import merge
+
+MAGIC = b"GLCCBL1\n"
+
+
+def _key(fingerprint):
+    digest = hashlib.blake2b(fingerprint.encode("utf-8"), digest_size=8).digest()
+    return int.from_bytes(digest, "little")
+
+
+class Baseline:
+    """
+    A set of fingerprints. Fingerprints are reduced to 64 bit hashes, so
+    a new fingerprint colliding with one of the baseline is possible, but
+    unlikely even with millions of fingerprints.
+    """
+    def __init__(self, keys):
+        self._keys = keys  # sorted array("Q")
+
+    @classmethod
+    def from_fingerprints(cls, fingerprints):
+        return cls(array.array("Q", sorted({_key(f) for f in fingerprints})))
+
+    @classmethod
+    def from_report(cls, fp):
+        return cls.from_fingerprints(
+            issue["fingerprint"] for issue in merge.iter_issues(fp)
+            if "fingerprint" in issue)
+
+    def __len__(self):
+        return len(self._keys)
+
+    def __contains__(self, fingerprint):
+        key = _key(fingerprint)
+        i = bisect.bisect_left(self._keys, key)
+        return i < len(self._keys) and self._keys[i] == key
+
+    def save(self, path):
+        keys = self._keys
+        if sys.byteorder != "little":
+            keys = array.array("Q", keys)
+            keys.byteswap()
+
+        with open(path, "wb") as fp:
+            fp.write(MAGIC)
+            keys.tofile(fp)
+
+
+def load(path):
+    """
+    Load a baseline from an index or from a report.
+    """
+    with open(path, "rb") as fp:
+        if fp.read(len(MAGIC)) == MAGIC:
+            keys = array.array("Q")
+            keys.frombytes(fp.read())
+            if sys.byteorder != "little":
+                keys.byteswap()
+            return Baseline(keys)
+
+    with open(path) as fp:
+        return Baseline.from_report(fp)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("reports", nargs="+",
+                        help="Reports (or indexes) whose issues make up the baseline.")
+    parser.add_argument("--output", "-o", required=True,
+                        help="Path of the index to write.")
+    options = parser.parse_args(argv)
+
+    keys = set()
+    try:
+        for path in options.reports:
+            keys.update(load(path)._keys)
+    except ValueError as e:
+        sys.exit(str(e))
+
+    Baseline(array.array("Q", sorted(keys))).save(options.output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,213 @@
+"""
+On-disk cache of the issues reported for every file.
+
+With --gl-codeclimate-cache, the formatter stores the issues of every
+file it sees together with a hash of the file's content. Issues of files
+that have not been checked by the current run are replayed from the cache
+if the file did not change since. Running this module (or the
+flake8-gl-codeclimate-changed script) with the same arguments as flake8
+prints the files that need to be checked again:
+
+    $ files=$(flake8-gl-codeclimate-changed --gl-codeclimate-cache .cc.json src/)
+    $ flake8 --format gl-codeclimate --gl-codeclimate-cache .cc.json ${files:-/dev/null}
+
+The cache is invalidated when flake8, any of its plugins or any option
+influencing the reported issues changes.
+"""
+import hashlib
+import importlib.metadata
+import json
+import os
+import sys
+
+import flake8
+
+DEFAULT_MAX_ENTRIES = 100000
+
+# Options that do not influence which issues are reported for a file.
+IGNORED_OPTIONS = frozenset([
+    "append_config",
+    "benchmark",
+    "bug_report",
+    "color",
+    "config",
+    "count",
+    "exit_zero",
+    "filenames",
+    "format",
+    "gl_codeclimate_async_write",
+    "gl_codeclimate_buffer_size",
+    "gl_codeclimate_cache",
+    "gl_codeclimate_cache_size",
+    "gl_codeclimate_compact",
+    "gl_codeclimate_sort",
+    "gl_codeclimate_sort_buffer",
+    "gl_codeclimate_stats",
+    "isolated",
+    "jobs",
+    "output_file",
+    "quiet",
+    "show_source",
+    "statistics",
+    "tee",
+    "verbose",
+])
+
+
+def plugin_versions():
+    """
+    Versions of flake8 and of all installed distributions providing
+    flake8 plugins.
+    """
+    versions = {"flake8": flake8.__version__}
+    for dist in importlib.metadata.distributions():
+        groups = {ep.group for ep in dist.entry_points}
+        if groups & {"flake8.extension", "flake8.report"}:
+            versions[dist.metadata["Name"]] = dist.version
+
+    return versions
+
+
+def version_key(options):
+    """
+    A key identifying the flake8 installation and the options that
+    went into a report. Includes the content of the baseline, which
+    decides which issues are reported.
+    """
+    relevant = {
+        name: repr(value)
+        for name, value in sorted(vars(options).items())
+        if name not in IGNORED_OPTIONS
+    }
+    data = json.dumps([plugin_versions(), relevant], sort_keys=True)
+    key = hashlib.sha1(data.encode("utf-8"), usedforsecurity=False).hexdigest()
+    baseline_path = getattr(options, "gl_codeclimate_baseline", None)
+    if baseline_path:
+        key += ":" + str(content_hash(baseline_path))
+
+    return key
+
+
+def content_hash(filename):
+    """
+    The hash of the content of filename, or None if it can't be read.
+    """
+    try:
+        with open(filename, "rb") as fp:
+            return hashlib.sha1(fp.read(), usedforsecurity=False).hexdigest()
+    except OSError:
+        return None
+
+
+class ReportCache:
+    """
+    Serialized issues of files by path and content hash.
+
+    Every entry remembers the run that used it last. When saving, the
+    least recently used entries beyond max_entries are evicted.
+    """
+    def __init__(self, path, version, max_entries=DEFAULT_MAX_ENTRIES):
+        self.path = path
+        self.version = version
+        self.max_entries = max_entries
+        self.run = 0
+        self.files = {}  # filename -> [content hash, last used run, issues]
+
+    def load(self):
+        """
+        Load the cache if it matches version. A missing or malformed cache
+        is treated as empty and rebuilt when saving.
+        """
+        try:
+            with open(self.path) as fp:
+                data = json.load(fp)
+            if data["version"] != self.version:
+                return
+
+            run, files = data["run"] + 1, data["files"]
+            if not all(isinstance(entry, list) and len(entry) == 3
+                       for entry in files.values()):
+                return
+        except (OSError, ValueError, KeyError, TypeError, AttributeError):
+            return
+
+        self.run = run
+        self.files = files
+
+    def save(self):
+        if len(self.files) > self.max_entries:
+            by_use = sorted(self.files.items(), key=lambda item: item[1][1])
+            self.files = dict(by_use[len(self.files) - self.max_entries:])
+
+        dirname = os.path.dirname(os.path.abspath(self.path))
+        os.makedirs(dirname, exist_ok=True)
+        tmp_path = "{}.{}.tmp".format(self.path, os.getpid())
+        with open(tmp_path, "w") as fp:
+            json.dump({
+                "version": self.version,
+                "run": self.run,
+                "files": self.files,
+            }, fp)
+        os.replace(tmp_path, self.path)
+
+    def is_current(self, filename):
+        """
+        Is the cached entry for filename up to date with its content?
+        """
+        entry = self.files.get(filename)
+        return entry is not None and entry[0] == content_hash(filename)
+
+    def store(self, filename, issues):
+        digest = content_hash(filename)
+        if digest is not None:
+            self.files[filename] = [digest, self.run, issues]
+
+    def replay(self, seen):
+        """
+        Yield the cached issues of all files that are not in seen and did
+        not change. Entries of changed or removed files are dropped.
+        """
+        for filename in list(self.files):
+            if filename in seen:
+                continue
+
+            if not self.is_current(filename):
+                del self.files[filename]
+                continue
+
+            entry = self.files[filename]
+            entry[1] = self.run
+            yield from entry[2]
+
+
+def main(argv=None):
+    """
+    Print the files a flake8 run with the given arguments has to check,
+    i.e. all files without an up to date entry in the cache.
+    """
+    from flake8.discover_files import expand_paths
+    from flake8.options.parse_args import parse_args
+
+    if argv is None:
+        argv = sys.argv[1:]
+
+    _, options = parse_args(argv)
+    if not options.gl_codeclimate_cache:
+        sys.exit("--gl-codeclimate-cache is required")
+
+    cache = ReportCache(options.gl_codeclimate_cache, version_key(options))
+    cache.load()
+
+    filenames = expand_paths(
+        paths=options.filenames,
+        stdin_display_name=options.stdin_display_name,
+        filename_patterns=options.filename,
+        exclude=(*options.exclude, *options.extend_exclude),
+    )
+    for filename in filenames:
+        if not cache.is_current(filename):
+            print(filename)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,54 @@
+"""
+Compressed report output, selected by the suffix of the output file.
+
+Reports are compressed while they are written, so a .gz or .zst report
+never exists uncompressed in memory or on disk. zstd uses compression.zstd
+on Python 3.14 and later, or the zstandard package otherwise.
+"""
+import gzip
+import io
+import os
+
+# Level 9, gzip's default, is several times slower for a few percent.
+GZIP_LEVEL = 6
+
+
+def _gzip(filename, mode):
+    return gzip.open(filename, mode + "b", compresslevel=GZIP_LEVEL)
+
+
+def _zstd(filename, mode):
+    try:
+        from compression import zstd
+    except ImportError:
+        import zstandard
+
+        return zstandard.ZstdCompressor().stream_writer(open(filename, mode + "b"))  # noqa: SIM115
+
+    return zstd.ZstdFile(filename, mode + "b")
+
+
+CODECS = {
+    ".gz": _gzip,
+    ".zst": _zstd,
+}
+
+
+def is_compressed(filename):
+    return os.path.splitext(filename)[1] in CODECS
+
+
+def open_output(filename, mode="a"):
+    """
+    Open filename for writing text, compressed if its suffix is .gz or .zst.
+
+    Like for uncompressed files, appending to a compressed file adds
+    another gzip member or zstd frame, which decompress to the
+    concatenation of both. Raises ImportError for .zst files if no zstd
+    implementation is available.
+    """
+    codec = CODECS.get(os.path.splitext(filename)[1])
+    if codec is None:
+        return open(filename, mode)  # noqa: SIM115
+
+    return io.TextIOWrapper(codec(filename, mode), encoding="utf-8")
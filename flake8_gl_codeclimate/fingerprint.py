@@ -0,0 +1,120 @@
+"""
+Fingerprints identifying an issue across pipeline runs.
+
+Gitlab compares the fingerprints of two reports to decide which issues
+are new and which ones have been fixed, so changing how they are computed
+makes every issue show up as fixed and new once.
+"""
+import functools
+import hashlib
+
+# sha1 is what fingerprints have always been computed with. blake2b with
+# a short digest is faster, but produces different fingerprints.
+ALGORITHMS = {
+    "sha1": functools.partial(hashlib.sha1, usedforsecurity=False),
+    "blake2b": functools.partial(hashlib.blake2b, digest_size=16),
+}
+
+DEFAULT_ALGORITHM = "sha1"
+
+
+def make_fingerprinter(algorithm=DEFAULT_ALGORITHM):
+    """
+    Return a function computing the fingerprint of a Violation.
+
+    The fingerprint is the hex digest over all fields of the violation
+    converted to strings and separated by spaces. The fields are fed to
+    the hash one by one rather than joining them into a single string.
+    """
+    new = ALGORITHMS[algorithm]
+
+    def fingerprint(v):
+        fields = iter(v)
+        h = new(str(next(fields)).encode("utf-8"))
+        update = h.update
+        for value in fields:
+            update(b" ")
+            update(str(value).encode("utf-8"))
+        return h.hexdigest()
+
+    return fingerprint
+
+
+fingerprint = make_fingerprinter()
+
+
+def make_group_fingerprinter(algorithm=DEFAULT_ALGORITHM):
+    """
+    Return a function computing the fingerprint of all violations of a
+    code in a file, see aggregate.
+
+    It covers only the code and the path, so that it does not change when
+    occurrences are added or fixed.
+    """
+    new = ALGORITHMS[algorithm]
+
+    def group_fingerprint(code, path):
+        h = new(code.encode("utf-8"))
+        h.update(b"\0")
+        h.update(path.encode("utf-8"))
+        h.update(b"\0group")
+        return h.hexdigest()
+
+    return group_fingerprint
+
+
+class SourceLineFingerprinter:
+    """
+    Compute fingerprints that do not depend on the location of an issue.
+
+    The fingerprint covers the code, the filename, the content of the
+    offending line with whitespace normalized and a counter distinguishing
+    multiple occurrences of the same code on identical lines in a file.
+    Adding or removing lines elsewhere in the file does not change it.
+
+    Source files are read at most once, their lines are kept until
+    forget() is called for the file.
+    """
+    def __init__(self, algorithm=DEFAULT_ALGORITHM):
+        self._new = ALGORITHMS[algorithm]
+        self._files = {}  # filename -> (lines, occurrences)
+
+    def _read_lines(self, filename):
+        try:
+            with open(filename, "rb") as fp:
+                return fp.read().splitlines()
+        except OSError:
+            # The report may be converted somewhere the sources are not
+            # available, fall back to an empty line for all issues.
+            return []
+
+    def forget(self, filename):
+        self._files.pop(filename, None)
+
+    def __call__(self, v, path=None):
+        """
+        The fingerprint of v. path is the file's path as reported, by
+        default its filename without leading "./".
+        """
+        entry = self._files.get(v.filename)
+        if entry is None:
+            entry = self._files[v.filename] = (self._read_lines(v.filename), {})
+        lines, occurrences = entry
+
+        line = b""
+        if 0 < v.line_number <= len(lines):
+            line = b" ".join(lines[v.line_number - 1].split())
+
+        key = (v.code, line)
+        occurrence = occurrences.get(key, 0)
+        occurrences[key] = occurrence + 1
+
+        if path is None:
+            path = v.filename[2:] if v.filename.startswith("./") else v.filename
+        h = self._new(v.code.encode("utf-8"))
+        h.update(b"\0")
+        h.update(path.encode("utf-8"))
+        h.update(b"\0")
+        h.update(line)
+        h.update(b"\0%d" % occurrence)
+        return h.hexdigest()
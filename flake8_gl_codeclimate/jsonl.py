@@ -0,0 +1,136 @@
+"""
+Turn a JSON Lines report into the JSON array Gitlab expects.
+
+    $ flake8 --format gl-codeclimate-jsonl --output-file report.jsonl ...
+    $ flake8-gl-codeclimate-finalize --output-file gl-code-quality-report.json report.jsonl
+
+Issues are not parsed, the input is copied in large blocks with newlines
+replaced by the separator between issues, producing the same output as
+--format gl-codeclimate. A last line without newline, as left behind by
+an interrupted run, is only kept if it is a complete issue.
+"""
+import argparse
+import contextlib
+import json
+import logging
+import os
+import sys
+
+BLOCK_SIZE = 1024 * 1024
+
+LOGGER = logging.getLogger("flake8-gl-codeclimate-finalize")
+
+
+def _is_complete(line):
+    try:
+        json.loads(line)
+    except ValueError:
+        return False
+    return True
+
+
+def complete_last_line(filename):
+    """
+    Make the JSON Lines file filename end with a newline, so that further
+    issues can be appended. An incomplete last line, as left behind by an
+    interrupted run, is removed. Returns the number of bytes removed.
+    """
+    with open(filename, "r+b") as fp:
+        end = pos = fp.seek(0, os.SEEK_END)
+        tail = b""
+        while pos > 0 and b"\n" not in tail:
+            step = min(pos, BLOCK_SIZE)
+            pos -= step
+            fp.seek(pos)
+            tail = fp.read(step) + tail
+            if tail.endswith(b"\n"):
+                return 0
+
+        line = tail[tail.rfind(b"\n") + 1:]
+        if not line:
+            return 0
+
+        if _is_complete(line):
+            fp.seek(0, os.SEEK_END)
+            fp.write(b"\n")
+            return 0
+
+        LOGGER.warning("Removed incomplete last line of %d bytes from %s",
+                       len(line), filename)
+        fp.truncate(end - len(line))
+        return len(line)
+
+
+def finalize(src, dst, block_size=BLOCK_SIZE, compact=False):
+    """
+    Copy the JSON lines of the binary file src as JSON array to the
+    binary file dst. Returns the number of bytes of a dropped incomplete
+    last line.
+    """
+    sep = b"," if compact else b",\n    "
+    prefix = b"" if compact else b"\n    "  # before the first issue
+    pending = b""
+    written = False
+
+    dst.write(b"[")
+    while True:
+        block = src.read(block_size)
+        if not block:
+            break
+
+        block = pending + block
+        end = block.rfind(b"\n")
+        if end < 0:
+            pending = block
+            continue
+
+        block, pending = block[:end], block[end + 1:]
+        # Empty lines are not issues, drop them.
+        if b"\n\n" in block or block.startswith(b"\n") or block.endswith(b"\n"):
+            block = b"\n".join(line for line in block.split(b"\n") if line)
+        if not block:
+            continue
+
+        dst.write(sep if written else prefix)
+        dst.write(block.replace(b"\n", sep))
+        written = True
+
+    dropped = 0
+    if pending.strip():
+        if _is_complete(pending):
+            dst.write(sep if written else prefix)
+            dst.write(pending.strip())
+            written = True
+        else:
+            dropped = len(pending)
+
+    dst.write(b"\n]\n" if written and not compact else b"]\n")
+    return dropped
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("report", nargs="?", default="-",
+                        help="JSON Lines report, stdin if not given.")
+    parser.add_argument("--output-file", type=str)
+    parser.add_argument("--compact", action="store_true", default=False,
+                        help="Write issues without newlines and indentation.")
+    options = parser.parse_args(argv)
+
+    with contextlib.ExitStack() as stack:
+        src = sys.stdin.buffer
+        if options.report != "-":
+            src = stack.enter_context(open(options.report, "rb"))  # noqa: SIM115
+        dst = sys.stdout.buffer
+        if options.output_file:
+            dst = stack.enter_context(open(options.output_file, "wb"))  # noqa: SIM115
+
+        dropped = finalize(src, dst, compact=options.compact)
+
+    if dropped:
+        LOGGER.warning("Dropped incomplete last line of %d bytes", dropped)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,171 @@
+"""
+Merge multiple Gitlab Code Quality reports into one.
+
+    $ flake8-gl-codeclimate-merge --output-file gl-code-quality-report.json shard-*.json
+
+Reports are parsed incrementally and issues with a fingerprint that was
+seen before are dropped, so memory use is bounded by the number of
+distinct fingerprints rather than the size of the reports. With --sort,
+issues are merged by path and line. This requires every report to be
+sorted already, as flake8 reports are.
+"""
+import argparse
+import contextlib
+import heapq
+import itertools
+import json
+import re
+import sys
+
+from flake8_gl_codeclimate import GitlabCodeClimateFormatter, serializer
+
+CHUNK_SIZE = 64 * 1024
+
+# Whitespace and separators between the issues of the array.
+_skip = re.compile(r"[ \t\r\n,]*").match
+
+# Longer than any JSON literal, number or escape sequence that may be cut
+# off at the end of the buffered input.
+_MAX_TOKEN = 32
+
+
+def _incomplete(e):
+    """
+    Could the JSONDecodeError e be caused by the input ending too early?
+    """
+    return e.msg.startswith("Unterminated string") or e.pos >= len(e.doc) - _MAX_TOKEN
+
+
+def iter_issues(fp, chunk_size=CHUNK_SIZE):
+    """
+    Yield the issues of the JSON array in fp without reading all of it.
+
+    >>> import io
+    >>> list(iter_issues(io.StringIO('[{"a": 1},\\n {"b": [2]}]'), chunk_size=3))
+    [{'a': 1}, {'b': [2]}]
+    """
+    decoder = json.JSONDecoder()
+    name = getattr(fp, "name", "<input>")
+    buf = ""
+    pos = 0
+    started = False
+
+    while True:
+        pos = _skip(buf, pos).end()
+        if pos == len(buf):
+            buf, pos = fp.read(chunk_size), 0
+            if not buf:
+                raise ValueError("{}: unexpected end of input".format(name))
+            continue
+
+        if not started:
+            if buf[pos] != "[":
+                raise ValueError("{}: expected a JSON array".format(name))
+            started = True
+            pos += 1
+            continue
+
+        if buf[pos] == "]":
+            return
+
+        try:
+            issue, pos = decoder.raw_decode(buf, pos)
+        except json.JSONDecodeError as e:
+            # An issue split across chunks, drop the consumed input and try
+            # again with more. Malformed input fails right away rather than
+            # after reading all of it.
+            more = fp.read(chunk_size) if _incomplete(e) else None
+            if not more:
+                raise
+            buf, pos = buf[pos:] + more, 0
+            continue
+
+        if not isinstance(issue, dict):
+            raise ValueError("{}: expected an issue, got {!r}".format(name, issue))
+
+        yield issue
+
+
+def sort_key(issue):
+    location = issue["location"]
+    return location["path"], location["lines"]["begin"]
+
+
+def checked_sorted(issues, name):
+    """
+    Pass through issues, raising ValueError if they aren't sorted.
+    """
+    last = None
+    for issue in issues:
+        key = sort_key(issue)
+        if last is not None and key < last:
+            raise ValueError("{}: issues are not sorted by path and line".format(name))
+        last = key
+        yield issue
+
+
+def merge(files, sort=False):
+    """
+    Yield the issues of all files, dropping duplicate fingerprints.
+    """
+    streams = [iter_issues(fp) for fp in files]
+    if sort:
+        streams = [checked_sorted(s, fp.name) for s, fp in zip(streams, files)]
+        issues = heapq.merge(*streams, key=sort_key)
+    else:
+        issues = itertools.chain.from_iterable(streams)
+
+    seen = set()
+    for issue in issues:
+        fingerprint = issue.get("fingerprint")
+        if fingerprint is not None:
+            if fingerprint in seen:
+                continue
+            seen.add(fingerprint)
+
+        yield issue
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("reports", nargs="+")
+    parser.add_argument("--output-file", type=str,
+                        help="Output file, compressed if it ends with .gz or .zst.")
+    parser.add_argument("--compact", action="store_true", default=False,
+                        help="Write issues without newlines and indentation.")
+    parser.add_argument("--sort", action="store_true", default=False,
+                        help="Merge issues by path and line.")
+    parser.add_argument("--json", choices=["auto"] + sorted(serializer.BACKENDS),
+                        default="auto",
+                        help="JSON backend for writing issues. (Default: %(default)s)")
+    options = parser.parse_args(argv)
+    dumps = serializer.get_dumps(options.json)
+
+    # The formatter appends to an existing file, the merged report replaces it.
+    if options.output_file:
+        with open(options.output_file, "w"):
+            pass
+
+    fmt = GitlabCodeClimateFormatter(argparse.Namespace(
+        output_file=options.output_file,
+        tee=False,
+        color="never",
+        gl_codeclimate_compact=options.compact,
+    ))
+
+    with contextlib.ExitStack() as stack:
+        files = [stack.enter_context(open(name))  # noqa: SIM115
+                 for name in options.reports]
+        fmt.start()
+        try:
+            for issue in merge(files, sort=options.sort):
+                fmt._write_issue(dumps(issue))
+        except ValueError as e:
+            sys.exit(str(e))
+        finally:
+            fmt.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,113 @@
+"""
+Check names of installed flake8 plugins by code prefix.
+
+flake8 plugins register themselves as entry points in the flake8.extension
+group, named by the prefix of the codes they report. The registry maps
+these prefixes to the name of the plugin's distribution, so that codes
+of plugins without a built-in check name are not reported as "unknown".
+
+Reading the entry points means reading the metadata of every installed
+distribution, so the registry is cached on disk and only rebuilt when
+the installed distributions change.
+"""
+import hashlib
+import importlib.metadata
+import json
+import os
+import sys
+
+METADATA_SUFFIXES = (".dist-info", ".egg-info")
+
+
+def default_cache_path():
+    cache_home = os.environ.get("XDG_CACHE_HOME")
+    if not cache_home:
+        cache_home = os.path.join(os.path.expanduser("~"), ".cache")
+
+    return os.path.join(cache_home, "flake8-gl-codeclimate", "registry.json")
+
+
+def check_name(dist_name):
+    """
+    The check name of a plugin distribution.
+
+    >>> check_name("flake8_import_order")
+    'import-order'
+    >>> check_name("pep8-naming")
+    'pep8-naming'
+    """
+    name = dist_name.lower().replace("_", "-")
+    return name[len("flake8-"):] if name.startswith("flake8-") else name
+
+
+def distributions_key(path=None):
+    """
+    A key identifying the installed distributions, computed from the names
+    and modification times of the metadata directories on path.
+    """
+    h = hashlib.sha1(usedforsecurity=False)
+    for dirname in sys.path if path is None else path:
+        try:
+            with os.scandir(dirname or ".") as it:
+                entries = sorted((e for e in it if e.name.endswith(METADATA_SUFFIXES)),
+                                 key=lambda e: e.name)
+        except OSError:
+            continue
+
+        h.update(os.fsencode(dirname) + b"\0")
+        for entry in entries:
+            try:
+                mtime = entry.stat().st_mtime_ns
+            except OSError:
+                continue
+            h.update("{}\0{}\0".format(entry.name, mtime).encode("utf-8", "surrogateescape"))
+
+    return h.hexdigest()
+
+
+def scan():
+    """
+    Code prefixes of the installed flake8 plugins mapped to their check
+    names. flake8's own plugins (pyflakes, pycodestyle) are left out.
+    """
+    prefixes = {}
+    for dist in importlib.metadata.distributions():
+        name = dist.metadata["Name"]
+        if not name or check_name(name) == "flake8":
+            continue
+
+        for ep in dist.entry_points:
+            if ep.group == "flake8.extension":
+                prefixes.setdefault(ep.name, check_name(name))
+
+    return prefixes
+
+
+def load(cache_path=None):
+    """
+    The code prefixes of the installed flake8 plugins, read from the cache
+    at cache_path if it is current. Without cache_path, always scan.
+    """
+    if not cache_path:
+        return scan()
+
+    key = distributions_key()
+    try:
+        with open(cache_path) as fp:
+            data = json.load(fp)
+        if data["key"] == key:
+            return data["prefixes"]
+    except (OSError, ValueError, KeyError, TypeError):
+        pass
+
+    prefixes = scan()
+    tmp_path = "{}.{}.tmp".format(cache_path, os.getpid())
+    try:
+        os.makedirs(os.path.dirname(os.path.abspath(cache_path)), exist_ok=True)
+        with open(tmp_path, "w") as fp:
+            json.dump({"key": key, "prefixes": prefixes}, fp)
+        os.replace(tmp_path, cache_path)
+    except OSError:
+        pass  # Not being able to cache the registry is not fatal.
+
+    return prefixes
@@ -0,0 +1,60 @@
+"""
+JSON backends for serializing issues.
+
+orjson and ujson are used if installed, with the standard library as
+fallback. The formatter itself defaults to its own template encoder
+(see GitlabCodeClimateFormatter._violation_to_json), which only has to
+escape the description and path of an issue and is faster than building
+the issue dict and serializing it with any of these.
+"""
+import json
+
+
+def _orjson():
+    import orjson
+
+    def dumps(obj):
+        return orjson.dumps(obj).decode("utf-8")
+
+    return dumps
+
+
+def _ujson():
+    import ujson
+
+    def dumps(obj):
+        return ujson.dumps(obj, ensure_ascii=True)
+
+    return dumps
+
+
+def _stdlib():
+    return json.dumps
+
+
+BACKENDS = {
+    "orjson": _orjson,
+    "ujson": _ujson,
+    "stdlib": _stdlib,
+}
+
+# Order in which backends are tried for "auto".
+PREFERENCE = ["orjson", "ujson", "stdlib"]
+
+
+def get_dumps(backend="auto"):
+    """
+    Return a function serializing an object to a single line JSON str.
+
+    Raises ImportError if the requested backend is not installed.
+    """
+    if backend != "auto":
+        return BACKENDS[backend]()
+
+    for name in PREFERENCE:
+        try:
+            return BACKENDS[name]()
+        except ImportError:
+            continue
+
+    raise AssertionError("stdlib backend not available")  # pragma: no cover
@@ -0,0 +1,139 @@
+"""
+Sorting more issues than should be kept in memory.
+
+Items are collected in memory up to a limit, then sorted and spilled to
+a temporary file as a run. Iterating the sorter merges all runs, keeping
+only one batch of items per run in memory. To bound the number of open
+temporary files, runs are merged into longer ones once there are
+MAX_FAN_IN of the same length, and before the final merge.
+"""
+import heapq
+import itertools
+import operator
+# Only temporary files written by the sorter itself are unpickled.
+import pickle  # noqa: S403
+import tempfile
+
+DEFAULT_MAX_ITEMS = 100000
+
+# Number of items pickled together when spilling a run.
+BATCH_SIZE = 1000
+
+# Maximum number of runs merged at once.
+MAX_FAN_IN = 64
+
+# Entries are (key, sequence number, item), the sequence number keeps the
+# sort stable and items from ever being compared.
+_entry_key = operator.itemgetter(0, 1)
+
+
+class ExternalSorter:
+    """
+    Sort items by key(item), spilling to temporary files in dir once more
+    than max_items are collected. With spill, items are converted with it
+    before being written to disk and are read back in that form.
+    """
+    def __init__(self, key, max_items=DEFAULT_MAX_ITEMS, dir=None, spill=None,
+                 fan_in=MAX_FAN_IN):
+        self._key = key
+        self.max_items = max(1, max_items)
+        self.fan_in = max(2, fan_in)
+        self._dir = dir
+        self._spill_item = spill
+        self._entries = []
+        # Temporary files with sorted runs, by the number of merges they
+        # went through.
+        self._levels = []
+        self._seq = 0
+
+    def add(self, item, key=None):
+        """
+        Add item, with its key if already known.
+        """
+        if key is None:
+            key = self._key(item)
+
+        self._entries.append((key, self._seq, item))
+        self._seq += 1
+        if len(self._entries) >= self.max_items:
+            self._spill()
+
+    def _spill(self):
+        self._entries.sort(key=_entry_key)
+        entries = self._entries
+        if self._spill_item is not None:
+            spill = self._spill_item
+            entries = ((key, seq, spill(item)) for key, seq, item in entries)
+
+        fp = self._write_run(entries)
+        self._entries = []
+        level = 0
+        while True:
+            if level == len(self._levels):
+                self._levels.append([])
+            self._levels[level].append(fp)
+            if len(self._levels[level]) < self.fan_in:
+                return
+
+            runs, self._levels[level] = self._levels[level], []
+            fp = self._merge_runs(runs)
+            level += 1
+
+    def _write_run(self, entries):
+        fp = tempfile.TemporaryFile(dir=self._dir)  # noqa: SIM115
+        entries = iter(entries)
+        while True:
+            batch = list(itertools.islice(entries, BATCH_SIZE))
+            if not batch:
+                break
+            pickle.dump(batch, fp, pickle.HIGHEST_PROTOCOL)
+
+        fp.seek(0)
+        return fp
+
+    def _merge_runs(self, runs):
+        """
+        Merge runs into a new one, closing them.
+        """
+        try:
+            return self._write_run(heapq.merge(*map(self._read_run, runs), key=_entry_key))
+        finally:
+            for fp in runs:
+                fp.close()
+
+    @staticmethod
+    def _read_run(fp):
+        while True:
+            try:
+                batch = pickle.load(fp)  # noqa: S301
+            except EOFError:
+                return
+            yield from batch
+
+    def __len__(self):
+        return self._seq
+
+    def __iter__(self):
+        """
+        Yield all items in order. Can only be done once.
+        """
+        self._entries.sort(key=_entry_key)
+        runs = [fp for level in self._levels for fp in level]
+        self._levels = [runs]
+        # The entries in memory take up one more slot of the final merge.
+        while len(runs) >= self.fan_in:
+            merged = self._merge_runs(runs[:self.fan_in])
+            del runs[:self.fan_in]
+            runs.append(merged)
+
+        streams = [self._read_run(fp) for fp in runs]
+        streams.append(self._entries)
+        for _, _, item in heapq.merge(*streams, key=_entry_key):
+            yield item
+
+    def close(self):
+        for level in self._levels:
+            for fp in level:
+                fp.close()
+        self._levels = []
+        self._entries = []
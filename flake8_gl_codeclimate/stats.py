@@ -0,0 +1,75 @@
+"""
+Timers and counters for the stages of producing a report.
+
+Enabled with --gl-codeclimate-stats or the FLAKE8_GL_CODECLIMATE_STATS
+environment variable. The formatter wraps its stages with timed() only
+when enabled, so there is no overhead otherwise.
+"""
+import collections
+import json
+import sys
+import time
+
+
+class Stats:
+    """
+    Accumulated wall clock time and calls per stage, violation counts
+    per check name and the number of issues written.
+    """
+    def __init__(self):
+        self.seconds = collections.defaultdict(float)
+        self.calls = collections.Counter()
+        self.check_names = collections.Counter()
+        self.issues = 0
+
+    def timed(self, name, func):
+        """
+        Wrap func to account its calls and time to the stage name.
+        """
+        seconds, calls = self.seconds, self.calls
+        perf_counter = time.perf_counter
+
+        def wrapper(*args, **kwargs):
+            start = perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                seconds[name] += perf_counter() - start
+                calls[name] += 1
+
+        return wrapper
+
+    def add(self, name, seconds):
+        self.seconds[name] += seconds
+        self.calls[name] += 1
+
+    def summary(self):
+        return {
+            "violations": sum(self.check_names.values()),
+            "issues": self.issues,
+            "stages": {
+                name: {"seconds": self.seconds[name], "calls": self.calls[name]}
+                for name in self.seconds
+            },
+            "check_names": dict(self.check_names.most_common()),
+        }
+
+    def report(self, path):
+        """
+        Write the summary as JSON to path, or as text to stderr for "-".
+        """
+        summary = self.summary()
+        if path != "-":
+            with open(path, "w") as fp:
+                json.dump(summary, fp, indent=2)
+                fp.write("\n")
+            return
+
+        lines = ["gl-codeclimate: {} issues from {} violations".format(
+            summary["issues"], summary["violations"])]
+        for name, stage in summary["stages"].items():
+            lines.append("  {:<12} {:>10.3f}s {:>10} calls".format(
+                name, stage["seconds"], stage["calls"]))
+        for check_name, count in summary["check_names"].items():
+            lines.append("  {:<24} {:>10} violations".format(check_name, count))
+        print("\n".join(lines), file=sys.stderr)
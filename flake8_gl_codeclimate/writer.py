@@ -0,0 +1,60 @@
+"""
+Writing the report from a background thread.
+
+Serializing issues needs the GIL, writing them mostly doesn't. With a
+slow output file (NFS, a pipe to a slow consumer) the formatter can keep
+serializing while earlier chunks are still being written.
+"""
+import queue
+import threading
+
+# Maximum number of chunks waiting to be written. With the default buffer
+# size of the formatter, that's about 4MiB.
+DEFAULT_QUEUE_SIZE = 64
+
+_STOP = object()
+
+
+class AsyncWriter:
+    """
+    Call write() for every line in a background thread, in order.
+
+    The first exception raised by write() is raised again by the next call
+    to write() or by close(), further lines are dropped.
+    """
+    def __init__(self, write, maxsize=DEFAULT_QUEUE_SIZE):
+        self._write = write
+        self._queue = queue.Queue(maxsize)
+        self._error = None
+        self._thread = threading.Thread(target=self._run, name="gl-codeclimate-writer",
+                                        daemon=True)
+
+    def _run(self):
+        while True:
+            line = self._queue.get()
+            if line is _STOP:
+                return
+
+            if self._error is None:
+                try:
+                    self._write(line)
+                except Exception as e:
+                    self._error = e
+
+    def start(self):
+        self._thread.start()
+
+    def write(self, line, source=None):
+        if self._error is not None:
+            raise self._error
+
+        self._queue.put(line)
+
+    def close(self):
+        """
+        Wait for all lines to be written.
+        """
+        self._queue.put(_STOP)
+        self._thread.join()
+        if self._error is not None:
+            raise self._error
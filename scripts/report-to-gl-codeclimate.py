@@ -2,16 +2,32 @@
 """
 Convert an existing flake8 report to a Gitlab Code Climate artifact.
 
-This guesses the format by trying default and pylint..
+Unless given with --input-format, the format (default or pylint) is
+detected from the first lines of the input. If both appear, every line
+is parsed with a single pattern accepting either format.
+
+With --jobs, the input is split into chunks that are parsed by a pool of
+worker processes. Regular files are split into newline aligned byte ranges
+the workers read themselves, other input (stdin) is sent to the workers in
+batches of lines. At most two chunks per job are in flight at any time.
+
+An --output-file ending in .gz or .zst is compressed while it is written.
 
 https://docs.gitlab.com/ee/user/project/merge_requests/code_quality.html
 """
 import argparse
+import collections
+import concurrent.futures
+import functools
+import io
+import itertools
 import logging
+import os
 import re
+import stat
 import sys
 
-import flake8.style_guide
+from flake8.style_guide import Violation
 
 import flake8_gl_codeclimate
 
@@ -24,79 +40,246 @@ ansi_ctrl = re.compile(r"\033\[[0-9]*m")
 # %(path)s:%(row)d:%(col)d: %(code)s %(text)s
 flake8_fmt_re = re.compile(r"^([^ ]+):([0-9]+):([0-9]+): ([^ ]+) (.+)$")
 
+# %(path)s:%(row)d: [%(code)s] %(text)
+pylint_fmt_re = re.compile(r"^([^ ]+):([0-9]+): \[([^ ]+)\] (.+)$")
+
+# Either of the above in a single pass.
+mixed_fmt_re = re.compile(
+    r"^(?P<path>[^ ]+):(?P<row>[0-9]+):"
+    r"(?:(?P<col>[0-9]+): (?P<code>[^ ]+)| \[(?P<pylint_code>[^ ]+)\])"
+    r" (?P<text>.+)$"
+)
+
+FORMAT_PATTERNS = {
+    "default": flake8_fmt_re,
+    "pylint": pylint_fmt_re,
+    "mixed": mixed_fmt_re,
+}
+
+# Number of lines looked at to detect the input format.
+DETECT_LINES = 100
 
-def violation_from_flake8_line(line):
+
+@functools.lru_cache()
+def make_parser(input_format):
     """
-    Given a line in "default format, parse out a Violation.
+    Return a function parsing a line in input_format ("default", "pylint"
+    or "mixed" for either) into a Violation, or None if it doesn't match.
+
+    >>> parse = make_parser("default")
+    >>> v = parse("examples/unused-module.py:5:1: F401 'sys' imported but unused")
+    >>> v.code, v.filename, v.line_number, v.column_number, v.text
+    ('F401', 'examples/unused-module.py', 5, 1, "'sys' imported but unused")
 
-        examples/unused-module.py:5:1: F401 'sys' imported but unused
+    >>> parse = make_parser("pylint")
+    >>> v = parse('tourmap/json.py:23: [E302] expected 2 blank lines, found 1')
+    >>> v.code, v.filename, v.line_number, v.column_number, v.text
+    ('E302', 'tourmap/json.py', 23, None, 'expected 2 blank lines, found 1')
 
+    >>> make_parser("mixed")("tourmap/json.py:23: [E302] expected 2 blank lines").code
+    'E302'
     """
-    match = flake8_fmt_re.match(line.strip())
-    if match is None:
-        return None
+    match, ansi_sub = FORMAT_PATTERNS[input_format].match, ansi_ctrl.sub
 
-    filename, line_number, column_number, code, text = match.groups()
-    return flake8.style_guide.Violation(
-        code=code,
-        filename=filename,
-        line_number=int(line_number),
-        column_number=int(column_number),
-        text=text,
-        physical_line=None
-    )
+    def parse(line):
+        if "\033" in line:
+            line = ansi_sub("", line)
 
+        m = match(line.strip())
+        if m is None:
+            return None
 
-# %(path)s:%(row)d: [%(code)s] %(text)
-pylint_fmt_re = re.compile(r"^([^ ]+):([0-9]+): \[([^ ]+)\] (.+)$")
+        if input_format == "default":
+            filename, line_number, column_number, code, text = m.groups()
+            column_number = int(column_number)
+        elif input_format == "pylint":
+            filename, line_number, code, text = m.groups()
+            column_number = None
+        else:
+            filename, line_number, column_number, code, pylint_code, text = m.groups()
+            if column_number is None:
+                code = pylint_code
+            else:
+                column_number = int(column_number)
 
+        # Positional arguments, this is called for every line of the input.
+        return Violation(code, filename, int(line_number), column_number, text, None)
 
-def violation_from_pylint_line(line):
+    return parse
+
+
+def detect_format(lines):
     """
-    Given a line in "pylint" format, parse out a Violation.
+    Guess the format of the input from a sample of its lines.
+
+    Returns "default" or "pylint" if all lines that parse are in that
+    format, "mixed" otherwise.
 
-    >>> line = 'tourmap/json.py:23: [E302] expected 2 blank lines, found 1'
-    >>> v = violation_from_pylint_line(line)
-    >>> v.code, v.filename, v.line_number, v.text
-    ('E302', 'tourmap/json.py', 23, 'expected 2 blank lines, found 1')
+    >>> detect_format(["a.py:1:1: E1 text", "garbage", "b.py:2:3: E2 text"])
+    'default'
+    >>> detect_format(["a.py:1: [E1] text", "b.py:2:3: E2 text"])
+    'mixed'
     """
-    match = pylint_fmt_re.match(line.strip())
-    if match is None:
-        return None
+    seen = set()
+    for line in lines:
+        for input_format in ["default", "pylint"]:
+            if make_parser(input_format)(line) is not None:
+                seen.add(input_format)
+                break
+
+    return seen.pop() if len(seen) == 1 else "mixed"
+
+
+def is_regular_file(fp):
+    if fp is sys.stdin:
+        return False
+    return stat.S_ISREG(os.fstat(fp.fileno()).st_mode)
+
+
+def collect(results):
+    """
+    Split parse results into a list of violations and the number of
+    ignored lines.
+    """
+    violations = []
+    ignored = 0
+    for v in results:
+        if v is None:
+            ignored += 1
+            continue
+        violations.append(v)
+
+    return violations, ignored
+
 
-    filename, line_number, code, text = match.groups()
-    return flake8.style_guide.Violation(
-        code=code,
-        filename=filename,
-        line_number=int(line_number),
-        column_number=None,
-        text=text,
-        physical_line=None
-    )
+def parse_lines(lines, input_format):
+    parse = make_parser(input_format)
+    return collect(parse(line) for line in lines)
+
+
+def parse_file_range(path, start, end, input_format):
+    """
+    Parse the lines between the byte offsets start and end of path.
+    """
+    with open(path, "rb") as fp:
+        fp.seek(start)
+        data = io.BytesIO(fp.read(end - start))
+
+    lines = io.TextIOWrapper(data, encoding="utf-8", errors="replace")
+    return parse_lines(lines, input_format)
+
+
+def file_ranges(path, chunk_size, input_format):
+    """
+    Yield (path, start, end, input_format) byte ranges of about chunk_size
+    bytes, extended to the end of the line they stop in.
+    """
+    with open(path, "rb") as fp:
+        size = os.fstat(fp.fileno()).st_size
+        start = 0
+        while start < size:
+            fp.seek(min(start + chunk_size, size))
+            fp.readline()
+            end = fp.tell()
+            yield path, start, end, input_format
+            start = end
+
+
+def line_batches(lines, chunk_size, input_format):
+    """
+    Yield (batch, input_format) with lists of about chunk_size characters
+    of lines.
+    """
+    batch = []
+    batch_size = 0
+    for line in lines:
+        batch.append(line)
+        batch_size += len(line)
+        if batch_size >= chunk_size:
+            yield batch, input_format
+            batch = []
+            batch_size = 0
+
+    if batch:
+        yield batch, input_format
+
+
+def parse_parallel(func, chunks, jobs):
+    """
+    Call func for every chunk in a process pool, yielding the results
+    (violations, ignored) in input order.
+    """
+    with concurrent.futures.ProcessPoolExecutor(max_workers=jobs) as executor:
+        pending = collections.deque()
+        for args in chunks:
+            pending.append(executor.submit(func, *args))
+            if len(pending) >= 2 * jobs:
+                yield pending.popleft().result()
+
+        while pending:
+            yield pending.popleft().result()
 
 
 def main():
     parser = argparse.ArgumentParser(description=__doc__)
     parser.add_argument("--input-file", type=argparse.FileType(mode="r"),
                         default=sys.stdin)
-    parser.add_argument("--output-file", type=str)
+    parser.add_argument("--output-file", type=str,
+                        help="Output file, compressed if it ends with .gz or .zst.")
+    parser.add_argument("--compact", dest="gl_codeclimate_compact",
+                        action="store_true", default=False,
+                        help="Write issues without newlines and indentation.")
+    parser.add_argument("--root", dest="gl_codeclimate_root", default=None,
+                        help="Report paths relative to this directory.")
+    parser.add_argument("--sort", dest="gl_codeclimate_sort",
+                        action="store_true", default=False,
+                        help="Sort issues by path, line and code.")
     parser.add_argument("--tee", action="store_true", default=False)
     parser.add_argument("--color", choices=["auto", "always", "never"], default="never")
+    parser.add_argument("--jobs", type=int, default=1,
+                        help="Number of processes parsing the input.")
+    parser.add_argument("--chunk-size", type=int, default=1024 * 1024,
+                        help="Approximate size of the input chunks in bytes "
+                             "handed to each process with --jobs.")
+    parser.add_argument("--input-format", choices=["auto", "default", "pylint"],
+                        default="auto",
+                        help="Format of the input. auto detects it from the "
+                             "first lines and handles a mix of both.")
     options = parser.parse_args()
     ignored = 0
 
     fmt = flake8_gl_codeclimate.GitlabCodeClimateFormatter(options)
     fmt.start()
-    for line in options.input_file:
-        line = ansi_ctrl.sub("", line)
-        v = violation_from_flake8_line(line)
-        if v is None:
-            v = violation_from_pylint_line(line)
-        if v is None:
-            ignored += 1
-            continue
+    sample = list(itertools.islice(options.input_file, DETECT_LINES))
+    lines = itertools.chain(sample, options.input_file)
+
+    input_format = options.input_format
+    if input_format == "auto":
+        input_format = detect_format(sample)
+        LOGGER.debug("Detected input format %s", input_format)
+
+    if options.jobs > 1:
+        if is_regular_file(options.input_file):
+            chunks = file_ranges(options.input_file.name, options.chunk_size,
+                                 input_format)
+            results = parse_parallel(parse_file_range, chunks, options.jobs)
+        else:
+            chunks = line_batches(lines, options.chunk_size, input_format)
+            results = parse_parallel(parse_lines, chunks, options.jobs)
+
+        for violations, chunk_ignored in results:
+            ignored += chunk_ignored
+            for v in violations:
+                fmt.handle(v)
+    else:
+        parse = make_parser(input_format)
+        for line in lines:
+            v = parse(line)
+            if v is None:
+                ignored += 1
+                continue
 
-        fmt.handle(v)
+            fmt.handle(v)
 
     fmt.stop()
 
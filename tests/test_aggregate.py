@@ -0,0 +1,27 @@
+import unittest
+
+from flake8.style_guide import Violation
+
+from flake8_gl_codeclimate import aggregate
+
+
+def violation(filename, code, line_number):
+    return Violation(code, filename, line_number, 1, "text", None)
+
+
+class TestAggregator(unittest.TestCase):
+
+    def test_groups(self):
+        a = aggregate.Aggregator(max_locations=2)
+        for line, code in enumerate(["E501", "F401", "E501", "E501", "E501"], 1):
+            self.assertEqual([], a.add(violation("a.py", code, line)))
+
+        done = a.add(violation("b.py", "E501", 1))
+        self.assertEqual(["E501", "F401"], [g.first.code for g in done])
+        self.assertEqual([4, 1], [g.count for g in done])
+        self.assertEqual([3, 4], list(done[0].lines))
+        self.assertEqual([], list(done[1].lines))
+
+        done = a.flush()
+        self.assertEqual(["b.py"], [g.first.filename for g in done])
+        self.assertEqual([], a.flush())
@@ -0,0 +1,60 @@
+import io
+import json
+import os
+import tempfile
+import unittest
+
+from flake8_gl_codeclimate import baseline
+
+
+class TestBaseline(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.report_fn = os.path.join(self.tmpdir.name, "report.json")
+        self.index_fn = os.path.join(self.tmpdir.name, "baseline.idx")
+        self.fingerprints = ["{:040x}".format(i * 7919) for i in range(100)]
+        with open(self.report_fn, "w") as fp:
+            json.dump([{"fingerprint": f} for f in self.fingerprints] + [{}], fp)
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def test_contains(self):
+        b = baseline.Baseline.from_fingerprints(self.fingerprints + self.fingerprints[:3])
+        self.assertEqual(100, len(b))
+        for f in self.fingerprints:
+            self.assertIn(f, b)
+        self.assertNotIn("{:040x}".format(1), b)
+        self.assertNotIn("", b)
+        self.assertNotIn("x", baseline.Baseline.from_fingerprints([]))
+
+    def test_from_report(self):
+        with open(self.report_fn) as fp:
+            b = baseline.Baseline.from_report(fp)
+        self.assertEqual(100, len(b))
+        self.assertIn(self.fingerprints[42], b)
+
+    def test_index(self):
+        baseline.main(["--output", self.index_fn, self.report_fn])
+        with open(self.index_fn, "rb") as fp:
+            self.assertTrue(fp.read().startswith(baseline.MAGIC))
+
+        b = baseline.load(self.index_fn)
+        self.assertEqual(100, len(b))
+        for f in self.fingerprints:
+            self.assertIn(f, b)
+        self.assertNotIn("{:040x}".format(1), b)
+
+        # Reports and indexes can be combined.
+        other_fn = os.path.join(self.tmpdir.name, "other.json")
+        with open(other_fn, "w") as fp:
+            json.dump([{"fingerprint": "other"}], fp)
+        baseline.main(["--output", self.index_fn, self.index_fn, other_fn])
+        b = baseline.load(self.index_fn)
+        self.assertEqual(101, len(b))
+        self.assertIn("other", b)
+
+    def test_invalid_report(self):
+        with self.assertRaisesRegex(ValueError, "expected a JSON array"):
+            baseline.Baseline.from_report(io.StringIO("{}"))
@@ -0,0 +1,111 @@
+import argparse
+import os
+import tempfile
+import unittest
+
+from flake8_gl_codeclimate import cache
+
+
+class TestReportCache(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmpdir.name, "cache", "gl-codeclimate.json")
+        self.files = {}
+        for name in ["a.py", "b.py", "c.py"]:
+            self.files[name] = os.path.join(self.tmpdir.name, name)
+            self.write(name, "import {}\n".format(name[0]))
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def write(self, name, content):
+        with open(self.files[name], "w") as fp:
+            fp.write(content)
+
+    def reload(self, version="v1", max_entries=cache.DEFAULT_MAX_ENTRIES):
+        c = cache.ReportCache(self.path, version, max_entries)
+        c.load()
+        return c
+
+    def test_replay(self):
+        c = self.reload()
+        c.store(self.files["a.py"], ["issue-a"])
+        c.store(self.files["b.py"], ["issue-b1", "issue-b2"])
+        c.save()
+
+        c = self.reload()
+        self.assertTrue(c.is_current(self.files["a.py"]))
+        self.assertFalse(c.is_current(self.files["c.py"]))
+        self.assertEqual(["issue-b1", "issue-b2"],
+                         list(c.replay({self.files["a.py"]})))
+
+    def test_changed_and_removed_files_dropped(self):
+        c = self.reload()
+        c.store(self.files["a.py"], ["issue-a"])
+        c.store(self.files["b.py"], ["issue-b"])
+        c.save()
+
+        self.write("a.py", "import os\n")
+        os.unlink(self.files["b.py"])
+
+        c = self.reload()
+        self.assertFalse(c.is_current(self.files["a.py"]))
+        self.assertEqual([], list(c.replay(set())))
+        self.assertEqual({}, c.files)
+
+    def test_malformed(self):
+        os.makedirs(os.path.dirname(self.path))
+        for data in ["", "[]", "{}", '{"version": "v1"}', '{"version": "v1", "run": 1}',
+                     '{"version": "v1", "run": "1", "files": {}}',
+                     '{"version": "v1", "run": 1, "files": []}',
+                     '{"version": "v1", "run": 1, "files": {"a.py": 1}}']:
+            with open(self.path, "w") as fp:
+                fp.write(data)
+
+            c = self.reload()
+            self.assertEqual(0, c.run)
+            self.assertEqual({}, c.files)
+            c.store(self.files["a.py"], ["issue-a"])
+            self.assertEqual(["issue-a"], list(c.replay(set())))
+            c.save()
+            self.assertTrue(self.reload().is_current(self.files["a.py"]))
+
+    def test_version_mismatch(self):
+        c = self.reload()
+        c.store(self.files["a.py"], ["issue-a"])
+        c.save()
+
+        self.assertEqual([], list(self.reload("v2").replay(set())))
+        self.assertEqual(["issue-a"], list(self.reload("v1").replay(set())))
+
+    def test_lru_eviction(self):
+        c = self.reload(max_entries=2)
+        c.store(self.files["a.py"], ["issue-a"])
+        c.store(self.files["b.py"], ["issue-b"])
+        c.save()
+
+        # a.py is replayed in the second run, b.py is not used.
+        c = self.reload(max_entries=2)
+        self.assertEqual(["issue-a"], list(c.replay({self.files["b.py"]})))
+        c.store(self.files["c.py"], ["issue-c"])
+        c.save()
+
+        c = self.reload(max_entries=2)
+        self.assertEqual({self.files["a.py"], self.files["c.py"]}, set(c.files))
+
+    def test_corrupt_cache(self):
+        os.makedirs(os.path.dirname(self.path))
+        with open(self.path, "w") as fp:
+            fp.write("{")
+        self.assertEqual({}, self.reload().files)
+
+    def test_version_key(self):
+        options = argparse.Namespace(max_line_length=79, filenames=["a.py"])
+        key = cache.version_key(options)
+
+        options.filenames = ["b.py"]
+        self.assertEqual(key, cache.version_key(options))
+
+        options.max_line_length = 120
+        self.assertNotEqual(key, cache.version_key(options))
@@ -0,0 +1,61 @@
+import gzip
+import os
+import tempfile
+import unittest
+
+from flake8_gl_codeclimate import compression
+
+try:
+    compression._zstd(os.devnull, "a").close()
+    have_zstd = True
+except ImportError:
+    have_zstd = False
+
+
+class TestCompression(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def write(self, name, *chunks):
+        path = os.path.join(self.tmpdir.name, name)
+        for chunk in chunks:
+            with compression.open_output(path) as fp:
+                fp.write(chunk)
+
+        return path
+
+    def test_is_compressed(self):
+        self.assertTrue(compression.is_compressed("report.json.gz"))
+        self.assertTrue(compression.is_compressed("report.zst"))
+        self.assertFalse(compression.is_compressed("report.json"))
+        self.assertFalse(compression.is_compressed("gz"))
+
+    def test_plain(self):
+        path = self.write("report.json", "[", "]\n")
+        with open(path) as fp:
+            self.assertEqual("[]\n", fp.read())
+
+    def test_gzip(self):
+        path = self.write("report.json.gz", "[", "\"€\"]\n")
+        with gzip.open(path, "rt", encoding="utf-8") as fp:
+            self.assertEqual("[\"€\"]\n", fp.read())
+
+    @unittest.skipUnless(have_zstd, "no zstd implementation")
+    def test_zstd(self):
+        path = self.write("report.json.zst", "[", "]\n")
+        with open(path, "rb") as fp:
+            data = fp.read()
+
+        try:
+            from compression import zstd
+        except ImportError:
+            import zstandard
+
+            reader = zstandard.ZstdDecompressor().stream_reader(data, read_across_frames=True)
+            self.assertEqual(b"[]\n", reader.read())
+        else:
+            self.assertEqual(b"[]\n", zstd.decompress(data))
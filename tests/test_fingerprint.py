@@ -0,0 +1,152 @@
+import hashlib
+import os
+import random
+import tempfile
+import unittest
+import unittest.mock
+
+from flake8.style_guide import Violation
+
+from flake8_gl_codeclimate import fingerprint
+
+
+def reference_fingerprint(v):
+    """
+    How fingerprints were computed before the fingerprint module existed.
+    """
+    b = bytes(" ".join([str(getattr(v, f)) for f in v._fields]), "utf-8")
+    return hashlib.sha1(b).hexdigest()  # noqa: S324
+
+
+class TestSha1Compatibility(unittest.TestCase):
+    """
+    Fingerprints must not change, otherwise Gitlab reports every issue
+    as fixed and new in the first merge request after an upgrade.
+    """
+
+    def test_known_fingerprints(self):
+        known = [
+            (Violation("E302", "./examples/hello-world.py", 23, None,
+                       "expected 2 blank lines, found 1", None),
+             "5aa08b48a444f030586e7c8b829794362aacf4a8"),
+            (Violation("F401", "examples/bad.py", 1, 1,
+                       "'sys' imported but unused", "import sys\n"),
+             "b52ba65c13652f47e6ead5aa7b0f1db623acf386"),
+            (Violation("W291", "./exämples/ünïcode.py", 3, 12,
+                       "trailing whitespace ☃", "x = 1  \U0001f600 \n"),
+             "8601184d2de6e3d6ff4542d74842ab67cf33155c"),
+        ]
+        for v, expected in known:
+            self.assertEqual(expected, fingerprint.fingerprint(v))
+            self.assertEqual(expected, fingerprint.make_fingerprinter("sha1")(v))
+
+    def test_random_violations(self):
+        rng = random.Random(42)  # noqa: S311
+        alphabet = "abc xyz_./:'\"\\\tä☃\U0001f600"
+
+        def text():
+            return "".join(rng.choice(alphabet) for _ in range(rng.randint(0, 40)))
+
+        for _ in range(1000):
+            v = Violation(
+                code=rng.choice(["E501", "F401", "SIM105", "X1"]),
+                filename=text(),
+                line_number=rng.randint(0, 100000),
+                column_number=rng.choice([None, 0, rng.randint(1, 200)]),
+                text=text(),
+                physical_line=rng.choice([None, text() + "\n"]),
+            )
+            self.assertEqual(reference_fingerprint(v), fingerprint.fingerprint(v))
+
+
+class TestBlake2b(unittest.TestCase):
+
+    def setUp(self):
+        self.fingerprint = fingerprint.make_fingerprinter("blake2b")
+        self.v = Violation("E302", "./examples/hello-world.py", 23, None,
+                           "expected 2 blank lines, found 1", None)
+
+    def test_short_digest(self):
+        result = self.fingerprint(self.v)
+        self.assertEqual(32, len(result))
+        self.assertEqual(result, self.fingerprint(self.v))
+        self.assertNotEqual(fingerprint.fingerprint(self.v), result)
+
+    def test_distinct(self):
+        other = self.v._replace(line_number=24)
+        self.assertNotEqual(self.fingerprint(self.v), self.fingerprint(other))
+
+    def test_unknown_algorithm(self):
+        with self.assertRaises(KeyError):
+            fingerprint.make_fingerprinter("md5")
+
+
+class TestSourceLineFingerprinter(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.filename = os.path.join(self.tmpdir.name, "module.py")
+        self.write_source([
+            "import os",
+            "x = 1  ",
+            "x = 1",
+        ])
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def write_source(self, lines):
+        with open(self.filename, "w") as fp:
+            fp.write("\n".join(lines) + "\n")
+
+    def violation(self, code, line_number):
+        return Violation(code, self.filename, line_number, 1, "text", None)
+
+    def fingerprints(self, violations):
+        fingerprinter = fingerprint.SourceLineFingerprinter()
+        return [fingerprinter(v) for v in violations]
+
+    def test_inserted_lines(self):
+        before = self.fingerprints([self.violation("F401", 1),
+                                    self.violation("W291", 2)])
+        self.write_source([
+            "#!/usr/bin/env python",
+            "",
+            "import os",
+            "x = 1  ",
+            "x = 1",
+        ])
+        after = self.fingerprints([self.violation("F401", 3),
+                                   self.violation("W291", 4)])
+        self.assertEqual(before, after)
+
+    def test_occurrences(self):
+        # Line 2 and 3 are identical once whitespace is normalized.
+        result = self.fingerprints([self.violation("E225", 2),
+                                    self.violation("E225", 3),
+                                    self.violation("E226", 3)])
+        self.assertEqual(3, len(set(result)))
+        self.assertEqual(result, self.fingerprints([self.violation("E225", 3),
+                                                    self.violation("E225", 2),
+                                                    self.violation("E226", 2)]))
+
+    def test_file_read_once(self):
+        fingerprinter = fingerprint.SourceLineFingerprinter()
+        with unittest.mock.patch("builtins.open", wraps=open) as open_mock:
+            for line_number in [1, 2, 3, 2, 1, 99]:
+                fingerprinter(self.violation("E501", line_number))
+        self.assertEqual(1, open_mock.call_count)
+
+        fingerprinter.forget(self.filename)
+        with unittest.mock.patch("builtins.open", wraps=open) as open_mock:
+            fingerprinter(self.violation("E501", 1))
+        self.assertEqual(1, open_mock.call_count)
+
+    def test_missing_file(self):
+        v = Violation("E501", "does/not/exist.py", 3, 1, "text", None)
+        result = self.fingerprints([v, v._replace(line_number=4)])
+        self.assertEqual(2, len(set(result)))
+
+    def test_blake2b(self):
+        fingerprinter = fingerprint.SourceLineFingerprinter("blake2b")
+        self.assertEqual(32, len(fingerprinter(self.violation("F401", 1))))
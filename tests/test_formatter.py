@@ -1,16 +1,35 @@
+import gzip
+import io
 import json
+import os
+import sys
 import tempfile
+import time
 import unittest
 import unittest.mock
 
 from flake8.style_guide import Violation
 
-from flake8_gl_codeclimate import GitlabCodeClimateFormatter
+from flake8_gl_codeclimate import (
+    CodeClassifier,
+    GitlabCodeClimateFormatter,
+    GitlabCodeClimateJsonLinesFormatter,
+    Issue,
+    fingerprint,
+    jsonl,
+)
 
 
 class TestGitlabCodeClimateFormatter(unittest.TestCase):
 
     def setUp(self):
+        # Keep the plugin registry cache out of the home directory.
+        cache_home = tempfile.TemporaryDirectory()
+        self.addCleanup(cache_home.cleanup)
+        env = unittest.mock.patch.dict(os.environ, XDG_CACHE_HOME=cache_home.name)
+        env.start()
+        self.addCleanup(env.stop)
+
         self.options = unittest.mock.Mock(["output_file", "tee", "color"])
         self.output_f = tempfile.NamedTemporaryFile(suffix=".json", dir=".")
         self.options.output_file = self.output_f.name
@@ -160,3 +179,571 @@ class TestGitlabCodeClimateFormatter(unittest.TestCase):
 
         self.assertEqual(1, len(violations))
         self.assertEqual("examples/hello-world.py", violations[0]["location"]["path"])
+
+    def _render(self, violations, buffer_size):
+        options = unittest.mock.Mock(
+            ["output_file", "tee", "color", "gl_codeclimate_buffer_size"])
+        options.output_file = None
+        options.tee = False
+        options.color = "never"
+        options.gl_codeclimate_buffer_size = buffer_size
+
+        formatter = GitlabCodeClimateFormatter(options)
+        with unittest.mock.patch("builtins.print") as print_mock:
+            formatter.start()
+            for v in violations:
+                formatter.handle(v)
+            formatter.stop()
+
+        return "".join(c.args[0] for c in print_mock.call_args_list), print_mock.call_count
+
+    def test_buffered_output_identical(self):
+        violations = [self.error1, self.error2, self.logging_error] * 10
+        unbuffered, unbuffered_writes = self._render(violations, 0)
+        buffered, buffered_writes = self._render(violations, 1024 * 1024)
+
+        self.assertEqual(unbuffered, buffered)
+        self.assertEqual(30, len(json.loads(buffered)))
+        # "[", one write per issue, closing newline and "]"
+        self.assertEqual(33, unbuffered_writes)
+        # "[", single flush, closing newline and "]"
+        self.assertEqual(4, buffered_writes)
+
+    def test_buffered_output_flush_threshold(self):
+        violations = [self.error1] * 10
+        unbuffered, _ = self._render(violations, 0)
+        buffered, buffered_writes = self._render(violations, 1)
+
+        self.assertEqual(unbuffered, buffered)
+        self.assertEqual(13, buffered_writes)
+
+    def test_empty_buffered(self):
+        output, _ = self._render([], 1024)
+        self.assertEqual("[]\n", output)
+
+    def test_violation_to_json_matches_json_dumps(self):
+        quirky = Violation(
+            code="SIM105",
+            filename="./exämples/\"quoted\" \\ path.py",
+            line_number=7,
+            column_number=3,
+            text="Use 'contextlib.suppress(ValueError)' \u2603 \U0001f600\t",
+            physical_line=None,
+        )
+        violations = [self.error1, self.error2, self.logging_error,
+                      self.complexity_error, self.security_error, quirky, quirky]
+        for v in violations:
+            expected = json.dumps(self.formatter._violation_to_codeclimate_issue(v))
+            self.assertEqual(expected, self.formatter._violation_to_json(v))
+
+    def test_blake2b_fingerprint(self):
+        self.options.gl_codeclimate_fingerprint = "blake2b"
+        formatter = GitlabCodeClimateFormatter(self.options)
+        formatter.start()
+        formatter.handle(self.error1)
+        formatter.stop()
+
+        with open(self.options.output_file) as fp:
+            violations = json.load(fp)
+
+        self.assertEqual(1, len(violations))
+        self.assertEqual(32, len(violations[0]["fingerprint"]))
+
+    def test_paths_without_beginning(self):
+        # The converter script doesn't call beginning() and finished().
+        violations = [self.error1, self.security_error, self.error1, self.error2]
+        self.formatter.start()
+        for v in violations:
+            self.formatter.handle(v)
+        self.formatter.stop()
+
+        with open(self.options.output_file) as fp:
+            paths = [v["location"]["path"] for v in json.load(fp)]
+
+        self.assertEqual(["examples/hello-world.py", "examples/insecure-code.py",
+                          "examples/hello-world.py", "examples/unknown.py"], paths)
+
+    def test_async_write(self):
+        violations = [self.error1, self.error2, self.logging_error] * 100
+        self.options.gl_codeclimate_buffer_size = 100
+        self.options.gl_codeclimate_async_write = True
+        formatter = GitlabCodeClimateFormatter(self.options)
+        formatter.start()
+        for v in violations:
+            formatter.handle(v)
+        formatter.stop()
+
+        with open(self.options.output_file) as fp:
+            data = fp.read()
+
+        self.output_f.truncate(0)
+        self.formatter.start()
+        for v in violations:
+            self.formatter.handle(v)
+        self.formatter.stop()
+
+        with open(self.options.output_file) as fp:
+            self.assertEqual(fp.read(), data)
+
+    def test_async_write_error(self):
+        self.options.gl_codeclimate_buffer_size = 0
+        self.options.gl_codeclimate_async_write = True
+        formatter = GitlabCodeClimateFormatter(self.options)
+        formatter.start()
+        output_fd = formatter.output_fd = unittest.mock.Mock(wraps=formatter.output_fd)
+        output_fd.write.side_effect = OSError("disk full")
+        writer = formatter._GitlabCodeClimateFormatter__writer
+
+        formatter.handle(self.error1)
+        while writer._error is None:
+            time.sleep(0.001)
+
+        with self.assertRaisesRegex(OSError, "disk full"):
+            formatter.stop()
+        self.assertFalse(writer._thread.is_alive())
+        output_fd.close.assert_called_once_with()
+
+    def test_issue_records(self):
+        violations = [self.error1, self.error2, self.logging_error, self.security_error]
+        for backend in ["template", "stdlib"]:
+            self.options.gl_codeclimate_json = backend
+            formatter = GitlabCodeClimateFormatter(self.options)
+            for v in violations:
+                issue = Issue.from_violation(v, fingerprint.fingerprint(v))
+                self.assertEqual(formatter._violation_to_json(v), formatter._issue_to_json(issue))
+
+    def test_issue_interned(self):
+        issue = Issue.from_violation(self.error1._replace(filename="".join(["./a", ".py"])))
+        self.assertIs(sys.intern("./a.py"), issue.filename)
+        self.assertFalse(hasattr(issue, "__dict__"))
+
+    def test_sort(self):
+        violations = [
+            self.error1._replace(line_number=30),
+            self.error2,
+            self.error1,
+            self.error1._replace(code="E301"),
+            self.security_error,
+        ]
+        self.options.gl_codeclimate_sort = True
+        self.options.gl_codeclimate_sort_buffer = 2
+        for order in [violations, violations[::-1]]:
+            self.output_f.truncate(0)
+            formatter = GitlabCodeClimateFormatter(self.options)
+            formatter.start()
+            for v in order:
+                formatter.handle(v)
+            formatter.stop()
+
+            with open(self.options.output_file) as fp:
+                data = fp.read()
+            keys = [(v["location"]["path"], v["location"]["lines"]["begin"], v["description"][-5:-1])
+                    for v in json.loads(data)]
+            self.assertEqual([
+                ("examples/hello-world.py", 23, "E301"),
+                ("examples/hello-world.py", 23, "E302"),
+                ("examples/hello-world.py", 30, "E302"),
+                ("examples/insecure-code.py", 42, "S102"),
+                ("examples/unknown.py", 99, "X111"),
+            ], keys)
+            if order is violations:
+                expected = data
+        self.assertEqual(expected, data)
+
+    def test_sort_same_issues(self):
+        violations = [self.error1, self.error2, self.logging_error, self.security_error] * 3
+        violations += [v._replace(line_number=v.line_number + 1) for v in violations]
+        for backend in ["template", "stdlib"]:
+            self.options.gl_codeclimate_json = backend
+            self.options.gl_codeclimate_sort = False
+            self.output_f.truncate(0)
+            formatter = GitlabCodeClimateFormatter(self.options)
+            formatter.start()
+            for v in violations:
+                formatter.handle(v)
+            formatter.stop()
+            with open(self.options.output_file) as fp:
+                expected = sorted(json.load(fp), key=lambda i: (
+                    i["location"]["path"], i["location"]["lines"]["begin"], i["description"]))
+
+            self.options.gl_codeclimate_sort = True
+            self.options.gl_codeclimate_sort_buffer = 5
+            self.output_f.truncate(0)
+            formatter = GitlabCodeClimateFormatter(self.options)
+            formatter.start()
+            for v in violations:
+                formatter.handle(v)
+            formatter.stop()
+            with open(self.options.output_file) as fp:
+                self.assertEqual(expected, json.load(fp))
+
+    def test_sort_aggregate(self):
+        self.options.gl_codeclimate_sort = True
+        self.options.gl_codeclimate_aggregate = True
+        formatter = GitlabCodeClimateFormatter(self.options)
+        formatter.start()
+        for v in [self.error2, self.error1, self.error1._replace(line_number=2)]:
+            formatter.handle(v)
+        formatter.stop()
+
+        with open(self.options.output_file) as fp:
+            paths = [v["location"]["path"] for v in json.load(fp)]
+        self.assertEqual(["examples/hello-world.py", "examples/unknown.py"], paths)
+
+    def test_root(self):
+        violations = [
+            self.error1,
+            self.security_error,
+            self.error1._replace(filename=os.path.abspath(self.error1.filename)),
+        ]
+        for root, expected in [
+            ("examples", ["hello-world.py", "insecure-code.py", "hello-world.py"]),
+            (os.path.join(os.getcwd(), "tests"), ["../examples/hello-world.py",
+                                                  "../examples/insecure-code.py",
+                                                  "../examples/hello-world.py"]),
+        ]:
+            self.output_f.truncate(0)
+            self.options.gl_codeclimate_root = root
+            formatter = GitlabCodeClimateFormatter(self.options)
+            formatter.start()
+            for v in violations:
+                formatter.handle(v)
+            formatter.stop()
+
+            with open(self.options.output_file) as fp:
+                paths = [v["location"]["path"] for v in json.load(fp)]
+            self.assertEqual(expected, paths)
+
+    def test_json_lines(self):
+        violations = [self.error1, self.error2, self.logging_error]
+        formatter = GitlabCodeClimateJsonLinesFormatter(self.options)
+        formatter.start()
+        for v in violations:
+            formatter.handle(v)
+        formatter.stop()
+
+        with open(self.options.output_file, "rb") as fp:
+            data = fp.read()
+
+        lines = data.decode().splitlines()
+        self.assertEqual([self.formatter._violation_to_json(v) for v in violations], lines)
+
+        self.output_f.truncate(0)
+        self.formatter.start()
+        for v in violations:
+            self.formatter.handle(v)
+        self.formatter.stop()
+
+        out = io.BytesIO()
+        jsonl.finalize(io.BytesIO(data), out)
+        with open(self.options.output_file, "rb") as fp:
+            self.assertEqual(fp.read(), out.getvalue())
+
+    def test_json_lines_append(self):
+        # An interrupted run left an incomplete last line behind.
+        self.output_f.write(b'{"a": 1}\n{"b": ')
+        self.output_f.flush()
+
+        formatter = GitlabCodeClimateJsonLinesFormatter(self.options)
+        formatter.start()
+        formatter.handle(self.error1)
+        formatter.stop()
+
+        out = io.BytesIO()
+        with open(self.options.output_file, "rb") as fp:
+            jsonl.finalize(fp, out)
+
+        issues = json.loads(out.getvalue())
+        self.assertEqual([{"a": 1}, self.formatter._violation_to_codeclimate_issue(self.error1)],
+                         issues)
+
+    def test_json_lines_empty(self):
+        formatter = GitlabCodeClimateJsonLinesFormatter(self.options)
+        formatter.start()
+        formatter.stop()
+        with open(self.options.output_file) as fp:
+            self.assertEqual("", fp.read())
+
+    def test_compact(self):
+        self.options.gl_codeclimate_compact = True
+        formatter = GitlabCodeClimateFormatter(self.options)
+        formatter.start()
+        formatter.handle(self.error1)
+        formatter.handle(self.error2)
+        formatter.stop()
+
+        with open(self.options.output_file) as fp:
+            data = fp.read()
+
+        issues = [self.formatter._violation_to_json(v) for v in [self.error1, self.error2]]
+        self.assertEqual("[" + ",".join(issues) + "]\n", data)
+
+    def test_gzip(self):
+        gzip_f = tempfile.NamedTemporaryFile(suffix=".json.gz", dir=".")
+        self.addCleanup(gzip_f.close)
+        self.options.output_file = gzip_f.name
+        formatter = GitlabCodeClimateFormatter(self.options)
+        formatter.start()
+        formatter.handle(self.error1)
+        formatter.stop()
+
+        with gzip.open(gzip_f.name, "rt") as fp:
+            violations = json.load(fp)
+
+        self.assertEqual(1, len(violations))
+        self.assertEqual("pycodestyle", violations[0]["check_name"])
+
+    def test_aggregate(self):
+        self.options.gl_codeclimate_aggregate = True
+        self.options.gl_codeclimate_aggregate_max_locations = 2
+        formatter = GitlabCodeClimateFormatter(self.options)
+        formatter.start()
+        formatter.beginning(self.error1.filename)
+        for line_number in [23, 25, 30, 31]:
+            formatter.handle(self.error1._replace(line_number=line_number))
+        formatter.handle(self.error2._replace(filename=self.error1.filename))
+        formatter.finished(self.error1.filename)
+        formatter.handle(self.error2)
+        formatter.stop()
+
+        with open(self.options.output_file) as fp:
+            violations = json.load(fp)
+
+        self.assertEqual(3, len(violations))
+        e302, x111, other = violations
+        self.assertEqual("expected 2 blank lines, found 1 [E302] (4 occurrences, 3 listed)",
+                         e302["description"])
+        self.assertEqual({"begin": 23, "end": 23}, e302["location"]["lines"])
+        self.assertEqual([25, 30], [loc["lines"]["begin"] for loc in e302["other_locations"]])
+        self.assertEqual("Some extension produced this. [X111]", x111["description"])
+        self.assertEqual([], x111["other_locations"])
+        self.assertEqual("examples/unknown.py", other["location"]["path"])
+        self.assertEqual(3, len({v["fingerprint"] for v in violations}))
+
+        # The fingerprint of a group does not depend on its lines.
+        self.output_f.truncate(0)
+        formatter = GitlabCodeClimateFormatter(self.options)
+        formatter.start()
+        formatter.handle(self.error2._replace(line_number=1))
+        formatter.stop()
+        with open(self.options.output_file) as fp:
+            self.assertEqual(other["fingerprint"], json.load(fp)[0]["fingerprint"])
+
+    def test_baseline(self):
+        baseline_f = tempfile.NamedTemporaryFile("w", suffix=".json", dir=".")
+        self.addCleanup(baseline_f.close)
+        json.dump([{"fingerprint": fingerprint.fingerprint(self.error1)}], baseline_f)
+        baseline_f.flush()
+
+        self.options.gl_codeclimate_baseline = baseline_f.name
+        for mode in ["skip", "mark"]:
+            self.output_f.truncate(0)
+            self.options.gl_codeclimate_baseline_mode = mode
+            formatter = GitlabCodeClimateFormatter(self.options)
+            formatter.start()
+            formatter.handle(self.error1)
+            formatter.handle(self.logging_error)
+            formatter.stop()
+
+            with open(self.options.output_file) as fp:
+                violations = json.load(fp)
+
+            if mode == "skip":
+                self.assertEqual(["logging-format"], [v["check_name"] for v in violations])
+            else:
+                self.assertEqual(["info", "minor"], [v["severity"] for v in violations])
+                self.assertEqual(self.formatter._violation_to_codeclimate_issue(self.error1),
+                                 dict(violations[0], severity="major"))
+
+    def test_check_names(self):
+        self.options.gl_codeclimate_check_names = ["X=x-plugin"]
+        formatter = GitlabCodeClimateFormatter(self.options)
+        formatter.start()
+        formatter.handle(self.error2)
+        formatter.stop()
+
+        with open(self.options.output_file) as fp:
+            violations = json.load(fp)
+
+        self.assertEqual("x-plugin", violations[0]["check_name"])
+        self.assertEqual("unknown", self.formatter.classifier.classify("X111").check_name)
+
+    def test_check_names_invalid(self):
+        self.options.gl_codeclimate_check_names = ["X"]
+        with self.assertRaisesRegex(ValueError, "PREFIX=VALUE"):
+            GitlabCodeClimateFormatter(self.options)
+
+    def test_severities_and_categories(self):
+        self.options.gl_codeclimate_severities = "E3=info, G=critical"
+        self.options.gl_codeclimate_categories = "E=Style|Clarity\nG0=Bug Risk"
+        formatter = GitlabCodeClimateFormatter(self.options)
+        formatter.start()
+        formatter.handle(self.error1)
+        formatter.handle(self.logging_error)
+        formatter.stop()
+
+        with open(self.options.output_file) as fp:
+            violations = json.load(fp)
+
+        self.assertEqual("info", violations[0]["severity"])
+        self.assertEqual(["Style", "Clarity"], violations[0]["categories"])
+        self.assertEqual("critical", violations[1]["severity"])
+        self.assertEqual(["Bug Risk"], violations[1]["categories"])
+
+    def test_severities_invalid(self):
+        self.options.gl_codeclimate_severities = "E=fatal"
+        with self.assertRaisesRegex(ValueError, "invalid value 'fatal'"):
+            GitlabCodeClimateFormatter(self.options)
+
+    def test_stable_fingerprints(self):
+        self.options.gl_codeclimate_stable_fingerprints = True
+        formatter = GitlabCodeClimateFormatter(self.options)
+        formatter.start()
+        formatter.beginning(self.error1.filename)
+        formatter.handle(self.error1)
+        formatter.handle(self.error1._replace(line_number=42))
+        formatter.finished(self.error1.filename)
+        formatter.stop()
+
+        with open(self.options.output_file) as fp:
+            violations = json.load(fp)
+
+        # The file does not exist, both lines are empty and only the
+        # occurrence counter differs.
+        self.assertEqual(2, len(violations))
+        self.assertNotEqual(violations[0]["fingerprint"], violations[1]["fingerprint"])
+        self.assertNotEqual(fingerprint.fingerprint(self.error1),
+                            violations[0]["fingerprint"])
+
+    def test_stable_fingerprints_root(self):
+        self.options.gl_codeclimate_stable_fingerprints = True
+        fingerprints = []
+        for filename, root in [(self.error1.filename, None),
+                               (os.path.abspath(self.error1.filename), os.getcwd())]:
+            self.options.gl_codeclimate_root = root
+            formatter = GitlabCodeClimateFormatter(self.options)
+            issue = formatter._violation_to_codeclimate_issue(
+                self.error1._replace(filename=filename))
+            self.assertEqual("examples/hello-world.py", issue["location"]["path"])
+            fingerprints.append(issue["fingerprint"])
+
+        self.assertEqual(fingerprints[0], fingerprints[1])
+
+    def test_stats(self):
+        stats_f = tempfile.NamedTemporaryFile(suffix=".json", dir=".")
+        self.addCleanup(stats_f.close)
+        self.options.gl_codeclimate_stats = stats_f.name
+        formatter = GitlabCodeClimateFormatter(self.options)
+        formatter.start()
+        for v in [self.error1, self.error1, self.security_error]:
+            formatter.handle(v)
+        formatter.stop()
+
+        with open(self.options.output_file) as fp:
+            violations = json.load(fp)
+        with open(stats_f.name) as fp:
+            stats = json.load(fp)
+
+        self.assertEqual(3, len(violations))
+        self.assertEqual(3, stats["violations"])
+        self.assertEqual(3, stats["issues"])
+        self.assertEqual({"pycodestyle": 2, "bandit": 1}, stats["check_names"])
+        self.assertEqual(2, stats["stages"]["classify"]["calls"])
+        for stage in ["fingerprint", "serialize", "handle"]:
+            self.assertEqual(3, stats["stages"][stage]["calls"])
+        self.assertEqual(1, stats["stages"]["checks"]["calls"])
+
+    def test_stats_aggregate_sort(self):
+        stats_f = tempfile.NamedTemporaryFile(suffix=".json", dir=".")
+        self.addCleanup(stats_f.close)
+        self.options.gl_codeclimate_stats = stats_f.name
+        self.options.gl_codeclimate_aggregate = True
+        self.options.gl_codeclimate_sort = True
+        formatter = GitlabCodeClimateFormatter(self.options)
+        formatter.start()
+        for v in [self.error1, self.error1, self.security_error]:
+            formatter.handle(v)
+        formatter.stop()
+
+        with open(self.options.output_file) as fp:
+            issues = json.load(fp)
+        with open(stats_f.name) as fp:
+            stats = json.load(fp)
+
+        self.assertEqual(2, len(issues))
+        self.assertEqual(3, stats["violations"])
+        self.assertEqual(2, stats["issues"])
+
+    def test_stats_disabled(self):
+        with unittest.mock.patch.dict("os.environ", {}, clear=True):
+            formatter = GitlabCodeClimateFormatter(self.options)
+        self.assertNotIn("handle", vars(formatter))
+        self.assertNotIn("write", vars(formatter))
+
+
+class TestCodeClassifier(unittest.TestCase):
+
+    def setUp(self):
+        # Keep the plugin registry cache out of the home directory.
+        cache_home = tempfile.TemporaryDirectory()
+        self.addCleanup(cache_home.cleanup)
+        env = unittest.mock.patch.dict(os.environ, XDG_CACHE_HOME=cache_home.name)
+        env.start()
+        self.addCleanup(env.stop)
+
+        self.classifier = CodeClassifier()
+
+    def test_exact_codes(self):
+        self.assertEqual("pyflakes", self.classifier.classify("F401").check_name)
+        self.assertEqual("mccabe", self.classifier.classify("C901").check_name)
+
+    def test_longest_prefix(self):
+        c = self.classifier.classify("SIM105")
+        self.assertEqual("simplify", c.check_name)
+        self.assertEqual(("Style", "Clarity"), c.categories)
+
+        c = self.classifier.classify("S102")
+        self.assertEqual("bandit", c.check_name)
+        self.assertEqual(("Security",), c.categories)
+        self.assertEqual("critical", c.severity)
+
+    def test_unknown(self):
+        c = self.classifier.classify("X111")
+        self.assertEqual("unknown", c.check_name)
+        self.assertEqual(("Bug Risk",), c.categories)
+        self.assertEqual("minor", c.severity)
+
+    def test_plugin_entry_points(self):
+        with unittest.mock.patch("flake8_gl_codeclimate.registry.load",
+                                 return_value={"B": "bugbear", "B9": "bugbear-opinionated"}):
+            self.assertEqual("bugbear", self.classifier.classify("B001").check_name)
+            self.assertEqual("bugbear-opinionated",
+                             self.classifier.classify("B950").check_name)
+            # Built-in names take precedence.
+            self.assertEqual("simplify", self.classifier.classify("SIM105").check_name)
+
+    def test_check_names(self):
+        classifier = CodeClassifier({"X1": "x-plugin", "E5": "line-length"})
+        self.assertEqual("x-plugin", classifier.classify("X111").check_name)
+        self.assertEqual("line-length", classifier.classify("E501").check_name)
+        self.assertEqual("pycodestyle", classifier.classify("E302").check_name)
+
+    def test_overrides(self):
+        classifier = CodeClassifier(
+            severities={"E": "info", "E9": "blocker", "F401": "major"},
+            categories={"E5": ("Style", "Clarity")},
+        )
+        self.assertEqual("info", classifier.classify("E302").severity)
+        self.assertEqual("blocker", classifier.classify("E999").severity)
+        self.assertEqual("major", classifier.classify("F401").severity)
+        self.assertEqual("minor", classifier.classify("F811").severity)
+
+        c = classifier.classify("E501")
+        self.assertEqual("pycodestyle", c.check_name)
+        self.assertEqual(("Style", "Clarity"), c.categories)
+        self.assertEqual(("Style",), classifier.classify("E302").categories)
+
+    def test_memoized(self):
+        c = self.classifier.classify("W291")
+        self.assertIs(c, self.classifier.classify("W291"))
+        self.assertEqual("pycodestyle", c.check_name)
@@ -1,10 +1,14 @@
 """
 Calling flake8 directly to do some "integration testing".
 """
+import gzip
 import json
+import os
 import subprocess
+import sys
 import tempfile
 import unittest
+import unittest.mock
 
 try:
     import flake8_bandit  # noqa: F401
@@ -16,6 +20,13 @@ except ImportError:
 class TestGtlabCodeClimate(unittest.TestCase):
 
     def setUp(self):
+        # Keep the plugin registry cache out of the home directory.
+        cache_home = tempfile.TemporaryDirectory()
+        self.addCleanup(cache_home.cleanup)
+        env = unittest.mock.patch.dict(os.environ, XDG_CACHE_HOME=cache_home.name)
+        env.start()
+        self.addCleanup(env.stop)
+
         self.flake8_output_f = tempfile.NamedTemporaryFile(suffix=".flake8", dir=".")
         self.flake8_output_fn = self.flake8_output_f.name
 
@@ -187,3 +198,259 @@ class TestGtlabCodeClimate(unittest.TestCase):
         self.assertEqual(5, len(result))
         self.assertIn("imported but unused", result[0]["description"])
         self.assertIn("undefined name 'parsre' [F821]", result[-1]["description"])
+
+    def _convert(self, input_fn, *extra_args, stdin=False):
+        args = [
+            "scripts/report-to-gl-codeclimate.py",
+            "--output-file", self.gl_codeclimate_output_fn,
+        ] + list(extra_args)
+        if stdin:
+            with open(input_fn) as fp:
+                out = subprocess.check_output(args, stdin=fp)
+        else:
+            out = subprocess.check_output(args + ["--input-file", input_fn])
+        self.assertFalse(out)
+
+        with open(self.gl_codeclimate_output_fn) as fp:
+            data = fp.read()
+
+        # The formatter appends to existing output files.
+        with open(self.gl_codeclimate_output_fn, "w"):
+            pass
+
+        return data
+
+    def test__flake8_report__to_gl_codeclimate_gzip(self):
+        args = [
+            "flake8",
+            "--output-file", self.flake8_output_fn,
+            "examples/bad.py",
+        ]
+        subprocess.call(args)
+        expected = json.loads(self._convert(self.flake8_output_fn))
+
+        with tempfile.TemporaryDirectory() as tmpdir:
+            output_fn = os.path.join(tmpdir, "report.json.gz")
+            args = [
+                "scripts/report-to-gl-codeclimate.py",
+                "--input-file", self.flake8_output_fn,
+                "--output-file", output_fn,
+                "--compact",
+            ]
+            subprocess.check_call(args)
+            with gzip.open(output_fn, "rt") as fp:
+                data = fp.read()
+
+        self.assertEqual(1, data.count("\n"))
+        self.assertEqual(expected, json.loads(data))
+
+    def test__flake8_report__to_gl_codeclimate_jobs(self):
+        args = [
+            "flake8",
+            "--output-file", self.flake8_output_fn,
+            "examples/",
+        ]
+        subprocess.call(args)
+        with open(self.flake8_output_fn) as fp:
+            lines = fp.readlines()
+        with open(self.flake8_output_fn, "w") as fp:
+            for i in range(50):
+                fp.write("garbage line {}\n".format(i))
+                fp.writelines(lines)
+
+        expected = self._convert(self.flake8_output_fn)
+        self.assertEqual(50 * len(lines), len(json.loads(expected)))
+
+        for stdin in [False, True]:
+            data = self._convert(self.flake8_output_fn,
+                                 "--jobs", "3", "--chunk-size", "500",
+                                 stdin=stdin)
+            self.assertEqual(expected, data)
+
+    def test__flake8_color_report__to_gl_codeclimate_file(self):
+        args = [
+            "flake8",
+            "--color", "always",
+            "--show-source",
+            "--output-file", self.flake8_output_fn,
+            "examples/",
+        ]
+        subprocess.call(args)
+        with open(self.flake8_output_fn, "rb") as fp:
+            data = fp.read()
+        self.assertIn(b"\033[", data)
+        with open(self.flake8_output_fn, "wb") as fp:
+            fp.write(data.replace(b"\n", b"\r\n"))
+
+        expected = self._convert(self.flake8_output_fn, stdin=True)
+        self.assertEqual(expected, self._convert(self.flake8_output_fn))
+        self.assertEqual(expected, self._convert(self.flake8_output_fn,
+                                                 "--jobs", "2", "--chunk-size", "500"))
+        result = json.loads(expected)
+        self.assertTrue(result)
+        self.assertNotIn("\033", expected)
+
+    def test__mixed_report__to_gl_codeclimate(self):
+        lines = []
+        for fmt in ["default", "pylint"]:
+            args = [
+                "flake8",
+                "--format", fmt,
+                "--output-file", self.flake8_output_fn,
+                "examples/bad.py",
+            ]
+            subprocess.call(args)
+            with open(self.flake8_output_fn) as fp:
+                lines.extend(fp.readlines())
+            with open(self.flake8_output_fn, "w"):
+                pass
+
+        with open(self.flake8_output_fn, "w") as fp:
+            fp.writelines(lines)
+
+        for stdin in [False, True]:
+            result = json.loads(self._convert(self.flake8_output_fn, stdin=stdin))
+            self.assertEqual(10, len(result))
+
+            # Only the lines in the given format are converted.
+            for fmt in ["default", "pylint"]:
+                data = self._convert(self.flake8_output_fn,
+                                     "--input-format", fmt,
+                                     stdin=stdin)
+                self.assertEqual(5, len(json.loads(data)))
+
+
+class TestGitlabCodeClimateCache(unittest.TestCase):
+
+    def setUp(self):
+        # Keep the plugin registry cache out of the home directory.
+        cache_home = tempfile.TemporaryDirectory()
+        self.addCleanup(cache_home.cleanup)
+        env = unittest.mock.patch.dict(os.environ, XDG_CACHE_HOME=cache_home.name)
+        env.start()
+        self.addCleanup(env.stop)
+
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.cache_fn = os.path.join(self.tmpdir.name, ".gl-codeclimate-cache.json")
+        self.report_fn = os.path.join(self.tmpdir.name, "report.json")
+        self.write("a.py", "import os\n")
+        self.write("b.py", "import sys\nx=1\n")
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def write(self, name, content):
+        with open(os.path.join(self.tmpdir.name, name), "w") as fp:
+            fp.write(content)
+
+    def changed(self, *args):
+        args = [
+            sys.executable, "-m", "flake8_gl_codeclimate.cache",
+            "--gl-codeclimate-cache", self.cache_fn,
+        ] + list(args)
+        out = subprocess.check_output(args, cwd=self.tmpdir.name, text=True)
+        return sorted(out.split())
+
+    def flake8(self, *args):
+        if os.path.exists(self.report_fn):
+            os.unlink(self.report_fn)
+
+        args = [
+            "flake8",
+            "--format", "gl-codeclimate",
+            "--gl-codeclimate-cache", self.cache_fn,
+            "--output-file", self.report_fn,
+        ] + list(args)
+        subprocess.call(args, cwd=self.tmpdir.name)
+        with open(self.report_fn) as fp:
+            return sorted(json.load(fp), key=lambda i: i["fingerprint"])
+
+    def test_incremental(self):
+        self.assertEqual(["./a.py", "./b.py"], self.changed("."))
+        full = self.flake8(".")
+        self.assertEqual(3, len(full))
+        self.assertEqual([], self.changed("."))
+
+        # Nothing changed, everything is replayed from the cache.
+        self.assertEqual(full, self.flake8("/dev/null"))
+
+        self.write("a.py", "import os\nimport re\n")
+        self.assertEqual(["./a.py"], self.changed("."))
+        incremental = self.flake8("./a.py")
+        self.assertEqual(4, len(incremental))
+        self.assertEqual(incremental, self.flake8("."))
+
+    def test_incremental_baseline(self):
+        self.flake8(".")
+        subprocess.check_call([
+            sys.executable, "-m", "flake8_gl_codeclimate.baseline",
+            "--output", "baseline.idx", self.report_fn,
+        ], cwd=self.tmpdir.name)
+        self.write("b.py", "import sys\nx=1\ny=2\n")
+
+        baseline = ["--gl-codeclimate-baseline", "baseline.idx"]
+        self.assertEqual(["./a.py", "./b.py"], self.changed(*baseline, "."))
+        self.assertEqual(1, len(self.flake8(*baseline, ".")))
+        self.assertEqual([], self.changed(*baseline, "."))
+        self.assertEqual(1, len(self.flake8(*baseline, "/dev/null")))
+
+    def test_options_invalidate(self):
+        self.flake8(".")
+        self.assertEqual([], self.changed("."))
+        self.assertEqual([], self.changed("--gl-codeclimate-stats", "stats.json", "."))
+        self.assertEqual(["./a.py", "./b.py"], self.changed("--select", "F", "."))
+        self.assertEqual(2, len(self.flake8("--select", "F", "./a.py", "./b.py")))
+
+    def test_config_overrides(self):
+        self.write("setup.cfg", "\n".join([
+            "[flake8]",
+            "gl-codeclimate-check-names = F4 = my-pyflakes",
+            "gl-codeclimate-severities = F401=blocker",
+            "gl-codeclimate-categories =",
+            "    F4=Bug Risk|Clarity",
+            "    E2=Style",
+            "",
+        ]))
+        issues = {i["description"].split()[-1]: i for i in self.flake8(".")}
+        self.assertEqual("my-pyflakes", issues["[F401]"]["check_name"])
+        self.assertEqual("pycodestyle", issues["[E225]"]["check_name"])
+        self.assertEqual("blocker", issues["[F401]"]["severity"])
+        self.assertEqual(["Bug Risk", "Clarity"], issues["[F401]"]["categories"])
+        self.assertEqual("major", issues["[E225]"]["severity"])
+        self.assertEqual(["Style"], issues["[E225]"]["categories"])
+
+
+class TestImportTime(unittest.TestCase):
+
+    def imported_modules(self, statement):
+        """
+        Modules imported by statement with their cumulative import time
+        in microseconds, as reported by -X importtime.
+        """
+        args = [sys.executable, "-X", "importtime", "-c", statement]
+        result = subprocess.run(args, capture_output=True, text=True, check=True)
+        modules = {}
+        for line in result.stderr.splitlines():
+            if not line.startswith("import time:") or "|" not in line:
+                continue
+            _, cumulative, name = line.split("|")
+            if cumulative.strip().isdigit():
+                modules[name.strip()] = int(cumulative)
+
+        return modules
+
+    def test_import_is_lazy(self):
+        modules = self.imported_modules("import flake8_gl_codeclimate")
+        self.assertIn("flake8_gl_codeclimate", modules)
+        for name in ["flake8.plugins.pyflakes", "pyflakes.checker", "mccabe"]:
+            self.assertNotIn(name, modules)
+
+    def test_classify_imports_tables(self):
+        statement = ";".join([
+            "import flake8_gl_codeclimate as m",
+            "assert 'F401' in m.PYFLAKE_CODES",
+            "assert m.CodeClassifier().classify('C901').check_name == 'mccabe'",
+        ])
+        modules = self.imported_modules(statement)
+        self.assertIn("pyflakes.checker", modules)
+        self.assertIn("mccabe", modules)
@@ -0,0 +1,72 @@
+import io
+import json
+import os
+import tempfile
+import unittest
+
+from flake8_gl_codeclimate import jsonl
+
+
+class TestFinalize(unittest.TestCase):
+
+    def finalize(self, data, **kwargs):
+        dst = io.BytesIO()
+        dropped = jsonl.finalize(io.BytesIO(data), dst, **kwargs)
+        return dst.getvalue(), dropped
+
+    def test_array(self):
+        issues = [{"fingerprint": str(i), "description": "x\ny"} for i in range(50)]
+        lines = [json.dumps(i) for i in issues]
+        data = "".join(line + "\n" for line in lines).encode()
+        expected = "[\n{}\n]\n".format(",\n".join("    " + line for line in lines))
+        for block_size in [1, 7, 100, 1 << 20]:
+            out, dropped = self.finalize(data, block_size=block_size)
+            self.assertEqual(expected, out.decode())
+            self.assertEqual(0, dropped)
+
+        out, _ = self.finalize(data, block_size=13, compact=True)
+        self.assertEqual("[" + ",".join(lines) + "]\n", out.decode())
+
+    def test_empty(self):
+        self.assertEqual((b"[]\n", 0), self.finalize(b""))
+        self.assertEqual((b"[]\n", 0), self.finalize(b"\n\n"))
+
+    def test_empty_lines(self):
+        out, _ = self.finalize(b'\n{"a": 1}\n\n\n{"b": 2}\n\n', block_size=3)
+        self.assertEqual([{"a": 1}, {"b": 2}], json.loads(out))
+
+    def test_incomplete_last_line(self):
+        out, dropped = self.finalize(b'{"a": 1}\n{"b": 2}\n{"c": ', block_size=4)
+        self.assertEqual([{"a": 1}, {"b": 2}], json.loads(out))
+        self.assertEqual(6, dropped)
+
+        out, dropped = self.finalize(b'{"a": 1}\n{"b": 2}', block_size=4)
+        self.assertEqual([{"a": 1}, {"b": 2}], json.loads(out))
+        self.assertEqual(0, dropped)
+
+    def test_complete_last_line(self):
+        cases = [
+            (b"", b"", 0),
+            (b'{"a": 1}\n', b'{"a": 1}\n', 0),
+            (b'{"a": 1}', b'{"a": 1}\n', 0),
+            (b'{"a": 1}\n{"b": ', b'{"a": 1}\n', 6),
+            (b'{"b": ', b"", 6),
+        ]
+        with tempfile.TemporaryDirectory() as tmpdir:
+            path = os.path.join(tmpdir, "report.jsonl")
+            for data, expected, removed in cases:
+                with open(path, "wb") as fp:
+                    fp.write(data)
+                self.assertEqual(removed, jsonl.complete_last_line(path))
+                with open(path, "rb") as fp:
+                    self.assertEqual(expected, fp.read())
+
+    def test_main(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            src = os.path.join(tmpdir, "report.jsonl")
+            dst = os.path.join(tmpdir, "report.json")
+            with open(src, "w") as fp:
+                fp.write('{"a": 1}\n')
+            jsonl.main(["--output-file", dst, src])
+            with open(dst) as fp:
+                self.assertEqual('[\n    {"a": 1}\n]\n', fp.read())
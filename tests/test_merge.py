@@ -0,0 +1,110 @@
+import io
+import json
+import os
+import tempfile
+import unittest
+
+from flake8_gl_codeclimate import merge
+
+
+def make_issue(path, line, fingerprint):
+    return {
+        "type": "issue",
+        "check_name": "pycodestyle",
+        "description": "trailing whitespace [W291]",
+        "categories": ["Style"],
+        "location": {"path": path, "lines": {"begin": line, "end": line}},
+        "fingerprint": fingerprint,
+        "severity": "minor",
+    }
+
+
+class TestIterIssues(unittest.TestCase):
+
+    def test_chunk_boundaries(self):
+        issues = [make_issue("a.py", i, str(i)) for i in range(20)]
+        for data in [json.dumps(issues), json.dumps(issues, indent=4)]:
+            for chunk_size in [1, 7, 64, 1 << 20]:
+                result = list(merge.iter_issues(io.StringIO(data), chunk_size))
+                self.assertEqual(issues, result)
+
+    def test_empty(self):
+        self.assertEqual([], list(merge.iter_issues(io.StringIO("[\n]\n"))))
+
+    def test_truncated(self):
+        data = json.dumps([make_issue("a.py", 1, "1"), make_issue("a.py", 2, "2")])
+        with self.assertRaises(ValueError):
+            list(merge.iter_issues(io.StringIO(data[:-20]), 16))
+        with self.assertRaises(ValueError):
+            list(merge.iter_issues(io.StringIO(data[:-1]), 16))
+
+    def test_malformed_fails_early(self):
+        issues = [make_issue("a.py", i, str(i)) for i in range(1000)]
+        data = '[{"a" 1}, ' + json.dumps(issues)[1:]
+        fp = io.StringIO(data)
+        with self.assertRaises(ValueError):
+            list(merge.iter_issues(fp, 64))
+        self.assertEqual(64, fp.tell())
+
+    def test_not_an_array(self):
+        with self.assertRaises(ValueError):
+            list(merge.iter_issues(io.StringIO('{"a": 1}')))
+        with self.assertRaises(ValueError):
+            list(merge.iter_issues(io.StringIO('[1, 2]')))
+
+
+class TestMerge(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.output_fn = os.path.join(self.tmpdir.name, "merged.json")
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def write_report(self, name, issues):
+        fn = os.path.join(self.tmpdir.name, name)
+        with open(fn, "w") as fp:
+            json.dump(issues, fp)
+        return fn
+
+    def run_merge(self, *args):
+        merge.main(["--output-file", self.output_fn] + list(args))
+        with open(self.output_fn) as fp:
+            return json.load(fp)
+
+    def test_dedup(self):
+        a = self.write_report("a.json", [make_issue("a.py", 1, "1"),
+                                         make_issue("b.py", 1, "2")])
+        b = self.write_report("b.json", [make_issue("b.py", 1, "2"),
+                                         make_issue("c.py", 1, "3")])
+        result = self.run_merge(a, b)
+        self.assertEqual(["1", "2", "3"], [i["fingerprint"] for i in result])
+
+        # The output file is replaced, not appended to.
+        self.assertEqual(result, self.run_merge(a, b))
+
+    def test_sort(self):
+        a = self.write_report("a.json", [make_issue("a.py", 1, "1"),
+                                         make_issue("c.py", 5, "2")])
+        b = self.write_report("b.json", [make_issue("a.py", 3, "3"),
+                                         make_issue("b.py", 1, "4"),
+                                         make_issue("c.py", 5, "2")])
+        result = self.run_merge("--sort", a, b)
+        self.assertEqual(["1", "3", "4", "2"], [i["fingerprint"] for i in result])
+
+    def test_sort_unsorted_input(self):
+        a = self.write_report("a.json", [make_issue("b.py", 1, "1"),
+                                         make_issue("a.py", 1, "2")])
+        with self.assertRaises(SystemExit):
+            self.run_merge("--sort", a)
+
+    def test_output_format(self):
+        issues = [make_issue("a.py", 1, "1"), make_issue("a.py", 2, "2")]
+        a = self.write_report("a.json", issues)
+        self.run_merge("--json", "stdlib", a)
+        with open(self.output_fn) as fp:
+            data = fp.read()
+
+        expected = "[\n    {},\n    {}\n]\n".format(*[json.dumps(i) for i in issues])
+        self.assertEqual(expected, data)
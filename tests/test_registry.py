@@ -0,0 +1,53 @@
+import os
+import tempfile
+import unittest
+import unittest.mock
+
+from flake8_gl_codeclimate import registry
+
+
+class TestRegistry(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmpdir.name, "registry", "registry.json")
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def test_check_name(self):
+        self.assertEqual("simplify", registry.check_name("flake8_simplify"))
+        self.assertEqual("import-order", registry.check_name("flake8-import-order"))
+        self.assertEqual("mccabe", registry.check_name("mccabe"))
+
+    def test_scan(self):
+        prefixes = registry.scan()
+        self.assertEqual("mccabe", prefixes["C90"])
+        self.assertNotIn("E", prefixes)  # flake8's own
+
+    def test_distributions_key(self):
+        os.mkdir(os.path.join(self.tmpdir.name, "a-1.0.dist-info"))
+        key = registry.distributions_key([self.tmpdir.name])
+        self.assertEqual(key, registry.distributions_key([self.tmpdir.name]))
+
+        os.mkdir(os.path.join(self.tmpdir.name, "b-1.0.dist-info"))
+        self.assertNotEqual(key, registry.distributions_key([self.tmpdir.name]))
+
+    def test_load_cached(self):
+        with unittest.mock.patch.object(registry, "scan", return_value={"X": "x"}) as scan:
+            self.assertEqual({"X": "x"}, registry.load(self.path))
+            self.assertEqual({"X": "x"}, registry.load(self.path))
+            self.assertEqual(1, scan.call_count)
+
+            with unittest.mock.patch.object(registry, "distributions_key", return_value="other"):
+                self.assertEqual({"X": "x"}, registry.load(self.path))
+            self.assertEqual(2, scan.call_count)
+
+    def test_load_corrupt(self):
+        os.makedirs(os.path.dirname(self.path))
+        with open(self.path, "w") as fp:
+            fp.write("[]")
+
+        with unittest.mock.patch.object(registry, "scan", return_value={"X": "x"}):
+            self.assertEqual({"X": "x"}, registry.load(self.path))
+            self.assertEqual({"X": "x"}, registry.load(self.path))
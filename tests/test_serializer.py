@@ -0,0 +1,73 @@
+import argparse
+import importlib.util
+import json
+import os
+import tempfile
+import unittest
+import unittest.mock
+
+from flake8.style_guide import Violation
+
+from flake8_gl_codeclimate import GitlabCodeClimateFormatter, serializer
+
+
+def installed(module):
+    return importlib.util.find_spec(module) is not None
+
+
+VIOLATIONS = [
+    Violation("E302", "./examples/hello-world.py", 23, None,
+              "expected 2 blank lines, found 1", None),
+    Violation("SIM105", "./exämples/\"quoted\" \\ path.py", 7, 3,
+              "Use 'contextlib.suppress(ValueError)' ☃ \U0001f600\t\n\x00",
+              "try:\n"),
+    Violation("X111", "unknown.py", 0, 0, "", None),
+]
+
+
+class TestBackendConformance(unittest.TestCase):
+    """
+    All backends must produce single line JSON parsing to the same issues.
+    """
+
+    def setUp(self):
+        # Keep the plugin registry cache out of the home directory.
+        cache_home = tempfile.TemporaryDirectory()
+        self.addCleanup(cache_home.cleanup)
+        env = unittest.mock.patch.dict(os.environ, XDG_CACHE_HOME=cache_home.name)
+        env.start()
+        self.addCleanup(env.stop)
+
+    def issues(self, backend):
+        options = argparse.Namespace(output_file=None, tee=False, color="never",
+                                     gl_codeclimate_json=backend)
+        formatter = GitlabCodeClimateFormatter(options)
+        return [formatter._violation_to_json(v) for v in VIOLATIONS]
+
+    def assertConforms(self, backend):
+        expected = self.issues("stdlib")
+        result = self.issues(backend)
+        for e, r in zip(expected, result):
+            self.assertNotIn("\n", r)
+            self.assertEqual(json.loads(e), json.loads(r))
+
+    def test_template(self):
+        # The template encoder is byte-identical to the stdlib.
+        self.assertEqual(self.issues("stdlib"), self.issues("template"))
+
+    def test_auto(self):
+        self.assertConforms("auto")
+
+    @unittest.skipUnless(installed("orjson"), "orjson not installed")
+    def test_orjson(self):
+        self.assertConforms("orjson")
+
+    @unittest.skipUnless(installed("ujson"), "ujson not installed")
+    def test_ujson(self):
+        self.assertConforms("ujson")
+
+    def test_get_dumps_missing(self):
+        for name in serializer.PREFERENCE:
+            if not installed(name) and name in ("orjson", "ujson"):
+                with self.assertRaises(ImportError):
+                    serializer.get_dumps(name)
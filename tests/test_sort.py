@@ -0,0 +1,73 @@
+import random
+import tempfile
+import unittest
+import unittest.mock
+
+from flake8_gl_codeclimate import sort
+
+
+class TestExternalSorter(unittest.TestCase):
+
+    def sorted(self, items, max_items, key=lambda item: item[0], spill=None,
+               fan_in=sort.MAX_FAN_IN):
+        sorter = sort.ExternalSorter(key, max_items, spill=spill, fan_in=fan_in)
+        try:
+            for item in items:
+                sorter.add(item)
+            self.assertEqual(len(items), len(sorter))
+            return list(sorter)
+        finally:
+            sorter.close()
+
+    def test_in_memory(self):
+        items = [(3, "a"), (1, "b"), (2, "c")]
+        self.assertEqual([(1, "b"), (2, "c"), (3, "a")], self.sorted(items, 10))
+
+    def test_spill(self):
+        rng = random.Random(0)  # noqa: S311
+        items = [(rng.randrange(100), i) for i in range(2500)]
+        with unittest.mock.patch.object(sort, "BATCH_SIZE", 7):
+            result = self.sorted(items, 100)
+
+        # Stable, items with the same key keep their order.
+        self.assertEqual(sorted(items, key=lambda item: item[0]), result)
+
+    def test_fan_in(self):
+        rng = random.Random(0)  # noqa: S311
+        items = [(rng.randrange(100), i) for i in range(1000)]
+        open_files = set()
+        max_open = 0
+        real_temporary_file = tempfile.TemporaryFile
+
+        def temporary_file(**kwargs):
+            nonlocal max_open
+            fp = real_temporary_file(**kwargs)
+            open_files.add(fp)
+            max_open = max(max_open, sum(not f.closed for f in open_files))
+            return fp
+
+        with unittest.mock.patch.object(sort.tempfile, "TemporaryFile", temporary_file):
+            for fan_in in [2, 3, 5]:
+                max_open = 0
+                result = self.sorted(items, 7, fan_in=fan_in)
+                self.assertEqual(sorted(items, key=lambda item: item[0]), result)
+                # 143 runs, at most fan_in - 1 of every length plus the
+                # one being written.
+                self.assertLessEqual(max_open, 8 * (fan_in - 1) + 1)
+                self.assertTrue(all(f.closed for f in open_files))
+
+    def test_spill_conversion(self):
+        items = [(i % 5, i) for i in range(20)]
+        result = self.sorted(items, 6, spill=list)
+        self.assertEqual(sorted(items, key=lambda item: item[0]),
+                         [tuple(item) for item in result])
+        # Only spilled items are converted, the last 2 stay in memory.
+        self.assertEqual(18, sum(isinstance(item, list) for item in result))
+
+    def test_uncomparable_items(self):
+        items = [{"k": i % 3} for i in range(10)]
+        result = self.sorted(items, 4, key=lambda item: item["k"])
+        self.assertEqual(sorted(items, key=lambda item: item["k"]), result)
+
+    def test_empty(self):
+        self.assertEqual([], self.sorted([], 1))
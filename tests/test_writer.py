@@ -0,0 +1,47 @@
+import threading
+import time
+import unittest
+
+from flake8_gl_codeclimate import writer
+
+
+class TestAsyncWriter(unittest.TestCase):
+
+    def test_order(self):
+        lines = []
+
+        def write(line):
+            if len(lines) % 10 == 0:
+                time.sleep(0.001)
+            lines.append((line, threading.current_thread().name))
+
+        w = writer.AsyncWriter(write, maxsize=4)
+        w.start()
+        for i in range(100):
+            w.write(str(i))
+        w.close()
+
+        self.assertEqual([str(i) for i in range(100)], [line for line, _ in lines])
+        self.assertEqual({"gl-codeclimate-writer"}, {name for _, name in lines})
+
+    def test_error(self):
+        failed = threading.Event()
+
+        def write(line):
+            if line == "3":
+                failed.set()
+                raise OSError("disk full")
+
+        w = writer.AsyncWriter(write, maxsize=1)
+        w.start()
+        for i in range(4):
+            w.write(str(i))
+        failed.wait()
+
+        with self.assertRaisesRegex(OSError, "disk full"):
+            for i in range(4, 1000):
+                w.write(str(i))
+                time.sleep(0.001)
+
+        with self.assertRaisesRegex(OSError, "disk full"):
+            w.close()